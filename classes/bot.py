@@ -12,7 +12,7 @@ import asyncpg
 from classes import context
 import db_backup
 import discord
-from discord.ext import commands, ipc, tasks
+from discord.ext import commands, ipc
 from extensions.utils import cache
 
 from classes.checks import CustomChecks
@@ -59,7 +59,7 @@ class SnedBot(commands.Bot):
             intents=intents,
             case_insensitive=True,
             activity=activity,
-            max_messages=10000,
+            max_messages=1000,  # Message logging uses its own compact store, see extensions/utils/message_store.py
             owner_id=163979124820541440,
         )
 
@@ -145,16 +145,15 @@ class SnedBot(commands.Bot):
             logging.info(f"Cogs loaded: {', '.join(cogs)}")
 
         # Insert all guilds the bot is member of into the db global config on startup
-        async with self.pool.acquire() as con:
-            for guild in self.guilds:
-                await con.execute(
-                    """
-                INSERT INTO global_config (guild_id) VALUES ($1)
-                ON CONFLICT (guild_id) DO NOTHING""",
-                    guild.id,
-                )
-        # Start daily database backup task
-        await self.backup_bot_db.start()
+        await self.pool.execute(
+            """
+        INSERT INTO global_config (guild_id) SELECT unnest($1::bigint[])
+        ON CONFLICT (guild_id) DO NOTHING""",
+            [guild.id for guild in self.guilds],
+        )
+
+        await self.global_config.load_pending_timeouts()
+        await self.global_config.load_modules()
 
     def get_localization(self, extension_name: str, lang: str):
         """
@@ -491,8 +490,8 @@ class SnedBot(commands.Bot):
             embed.set_footer(text=f"Requested by {ctx.author}")
         return embed
 
-    @tasks.loop(hours=24.0)
     async def backup_bot_db(self):
+        """Daily database backup, scheduled by the Timers extension"""
         if self.skip_db_backup == False:  # Prevent quick bot restarts from triggering the system
             file = await db_backup.backup_database(self.dsn)
             await self.wait_until_ready()
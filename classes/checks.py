@@ -1,3 +1,8 @@
+from typing import Dict
+
+MAX_MEMOIZED_MEMBERS = 5000  # Per guild, the memo is cleared once it grows past this
+
+
 class CustomChecks:
     """
     Custom checks for commands and cogs across the bot
@@ -7,6 +12,16 @@ class CustomChecks:
 
     def __init__(self, bot):
         self.bot = bot
+        # guild_id -> member_id -> perm_node -> result, invalidated on role & permission changes
+        self.member_perms: Dict[int, Dict[int, Dict[str, bool]]] = {}
+
+    def invalidate_member(self, guild_id: int, member_id: int) -> None:
+        guild_perms = self.member_perms.get(guild_id)
+        if guild_perms:
+            guild_perms.pop(member_id, None)
+
+    def invalidate_guild(self, guild_id: int) -> None:
+        self.member_perms.pop(guild_id, None)
 
     async def has_owner(self, ctx):
         """
@@ -22,26 +37,35 @@ class CustomChecks:
         True if module is enabled, false otherwise. module_name is the extension filename.
         """
 
-        records = await self.bot.caching.get(table="modules", guild_id=ctx.guild.id, module_name=module_name)
-        if records and records[0]["is_enabled"]:
-            return records[0]["is_enabled"]
-        else:
-            return True
+        return await self.bot.global_config.is_module_enabled(ctx.guild.id, module_name)
 
     async def has_permissions(self, ctx, perm_node: str):
         """
-        Returns True if a user is in the specified permission node,
+        Returns True if a user is in the specified permission node, or a node that includes it,
         or in the administrator node, or is a Discord administrator, or is the owner.
+        Results are memoized per member until their roles or the guild's permissions change.
         """
 
         if ctx.guild:
-            user_role_ids = [x.id for x in ctx.author.roles]
-            role_ids = await ctx.bot.get_cog("Permissions").get_perms(ctx.guild, perm_node)
-            admin_role_ids = await ctx.bot.get_cog("Permissions").get_perms(ctx.guild, "admin_permitted")
-            return (
-                any(role in user_role_ids for role in admin_role_ids)
-                or any(role in user_role_ids for role in role_ids)
-                or ctx.author.id == ctx.bot.owner_id
-                or ctx.author.id == ctx.guild.owner_id
-                or ctx.author.guild_permissions.administrator
-            )
+            if ctx.author.id == ctx.bot.owner_id or ctx.author.id == ctx.guild.owner_id:
+                return True
+
+            guild_perms = self.member_perms.setdefault(ctx.guild.id, {})
+            member_perms = guild_perms.get(ctx.author.id)
+            if member_perms is None:
+                if len(guild_perms) >= MAX_MEMOIZED_MEMBERS:
+                    guild_perms.clear()
+                member_perms = guild_perms[ctx.author.id] = {}
+
+            result = member_perms.get(perm_node)
+            if result is None:
+                # Inherited nodes & admin_permitted are already resolved in the permission map
+                perm_map = await ctx.bot.get_cog("Permissions").get_perm_map(ctx.guild)
+                if perm_node not in perm_map:
+                    raise ValueError("Invalid permission-node specified.")
+                role_ids = perm_map[perm_node]
+                result = ctx.author.guild_permissions.administrator or not role_ids.isdisjoint(
+                    role.id for role in ctx.author.roles
+                )
+                member_perms[perm_node] = result
+            return result
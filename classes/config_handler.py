@@ -1,9 +1,9 @@
+import dataclasses
 import json
 import logging
-from typing import List
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
 
 import asyncpg
-from discord.ext import tasks
 
 from classes.db_user import User
 
@@ -16,11 +16,17 @@ class ConfigHandler:
 
     def __init__(self, bot):
         self.bot = bot
-        self.cleanup_userdata.start()
+        self._users: Dict[Tuple[int, int], User] = {}  # (user_id, guild_id) -> cached user with non-default data
+        self._generations: Dict[Tuple[int, int], int] = {}  # (user_id, guild_id) -> times the cached user was dropped
+        self._non_default: Dict[int, Set[int]] = {}  # guild_id -> IDs of users with non-default data
+        self._loaded_guilds: Set[int] = set()  # Guilds whose _non_default set is complete
+        self.pending_timeouts: Dict[int, Dict[int, int]] = {}  # guild_id -> user_id -> timeout_on_join expiry
+        self.pending_timeouts_loaded = False
+        self.disabled_modules: Dict[int, FrozenSet[str]] = {}  # guild_id -> names of disabled modules
+        self.modules_loaded = False
 
-    @tasks.loop(seconds=3600.0)
     async def cleanup_userdata(self):
-        """Clean up garbage userdata from db"""
+        """Clean up garbage userdata from db, scheduled hourly by the Timers extension"""
 
         await self.bot.wait_until_ready()
         await self.bot.pool.execute("DELETE FROM users WHERE flags IS NULL and warns = 0 AND notes IS NULL")
@@ -37,16 +43,144 @@ class ConfigHandler:
             # This one is necessary so that the list of guilds the bot is in stays accurate
             await con.execute("""INSERT INTO global_config (guild_id) VALUES ($1)""", guild_id)
 
+        self._users = {key: user for key, user in self._users.items() if key[1] != guild_id}
+        self._non_default.pop(guild_id, None)
+        self._loaded_guilds.discard(guild_id)
+        self.pending_timeouts.pop(guild_id, None)
+        self.disabled_modules.pop(guild_id, None)
+
         await self.caching.wipe(guild_id)
         logging.warning(f"Config reset and cache wiped for guild {guild_id}.")
 
+    def _copy_user(self, user: User) -> User:
+        """Return a copy of a cached user, so callers mutating it do not corrupt the cache."""
+        return dataclasses.replace(
+            user,
+            flags=dict(user.flags) if user.flags else {},
+            notes=list(user.notes) if user.notes else None,
+        )
+
+    def _is_default(self, user: User) -> bool:
+        return not user.flags and not user.warns and not user.notes
+
+    def _set_pending_timeout(self, user_id: int, guild_id: int, expiry: Optional[int]) -> None:
+        """Keep the in-memory timeout_on_join index in sync with a user's flags."""
+        if expiry is not None:
+            self.pending_timeouts.setdefault(guild_id, {})[user_id] = expiry
+        elif user_id in self.pending_timeouts.get(guild_id, {}):
+            self.pending_timeouts[guild_id].pop(user_id)
+            if not self.pending_timeouts[guild_id]:
+                self.pending_timeouts.pop(guild_id)
+
+    async def load_pending_timeouts(self):
+        """
+        Load all pending timeouts on join into memory with a single query, called on startup
+        Uses the users_timeout_on_join_idx expression index, so it does not scan all users
+        """
+        records = await self.bot.pool.fetch(
+            """
+        SELECT guild_id, user_id, (flags->>'timeout_on_join')::bigint AS expiry FROM users
+        WHERE (flags->>'timeout_on_join') IS NOT NULL"""
+        )
+        for record in records:
+            self._set_pending_timeout(record.get("user_id"), record.get("guild_id"), record.get("expiry"))
+        self.pending_timeouts_loaded = True
+        logging.info(f"Loaded {len(records)} pending timeouts on join.")
+
+    async def get_pending_timeout(self, user_id: int, guild_id: int) -> Optional[int]:
+        """
+        Returns the expiry of the timeout a user should receive when joining the guild, or None if there is none.
+        This is a dictionary lookup once load_pending_timeouts() ran.
+        """
+        if self.pending_timeouts_loaded:
+            return self.pending_timeouts.get(guild_id, {}).get(user_id)
+        user = await self.get_user(user_id, guild_id)
+        return user.flags.get("timeout_on_join") if user.flags else None
+
+    async def load_modules(self):
+        """
+        Load the disabled modules of every guild into memory with a single query, called on startup
+        """
+        records = await self.bot.pool.fetch(
+            """
+        SELECT guild_id, array_agg(module_name) AS module_names FROM modules
+        WHERE NOT is_enabled GROUP BY guild_id"""
+        )
+        self.disabled_modules = {record.get("guild_id"): frozenset(record.get("module_names")) for record in records}
+        self.modules_loaded = True
+        logging.info(f"Loaded disabled modules for {len(records)} guilds.")
+
+    async def is_module_enabled(self, guild_id: int, module_name: str) -> bool:
+        """
+        Returns if a module is enabled in a guild, modules without an entry are enabled.
+        This is a set lookup once load_modules() ran.
+        """
+        if self.modules_loaded:
+            return module_name not in self.disabled_modules.get(guild_id, ())
+        return not await self.bot.pool.fetchval(
+            """SELECT EXISTS(SELECT 1 FROM modules WHERE guild_id = $1 AND module_name = $2 AND NOT is_enabled)""",
+            guild_id,
+            module_name,
+        )
+
+    async def set_modules(self, guild_id: int, modules: Dict[str, bool]) -> None:
+        """
+        Enable or disable any number of modules in a guild with a single statement.
+        modules maps module names to their new state.
+        """
+        if not modules:
+            return
+
+        records = await self.bot.pool.fetch(
+            """
+        INSERT INTO modules (guild_id, module_name, is_enabled)
+        SELECT $1, module_name, is_enabled FROM unnest($2::text[], $3::bool[]) AS m(module_name, is_enabled)
+        ON CONFLICT (guild_id, module_name) DO
+        UPDATE SET is_enabled = EXCLUDED.is_enabled
+        RETURNING module_name, is_enabled""",
+            guild_id,
+            list(modules.keys()),
+            list(modules.values()),
+        )
+        disabled = set(self.disabled_modules.get(guild_id, ()))
+        for record in records:
+            if record.get("is_enabled"):
+                disabled.discard(record.get("module_name"))
+            else:
+                disabled.add(record.get("module_name"))
+
+        if disabled:
+            self.disabled_modules[guild_id] = frozenset(disabled)
+        else:
+            self.disabled_modules.pop(guild_id, None)
+        await self.bot.caching.refresh(table="modules", guild_id=guild_id)
+
+    def _mark_non_default(self, user_id: int, guild_id: int) -> None:
+        # Also recorded while the guild is still loading, the loaded IDs are merged into the same set
+        self._non_default.setdefault(guild_id, set()).add(user_id)
+
+    async def _load_guild(self, guild_id: int) -> Set[int]:
+        """
+        Load the IDs of all users in a guild that have non-default data with a single query.
+        Any other user of a loaded guild is known to be default, and needs no database lookup.
+        """
+        if guild_id not in self._loaded_guilds:
+            records = await self.bot.pool.fetch(
+                """
+            SELECT user_id FROM users
+            WHERE guild_id = $1 AND (flags IS NOT NULL OR warns != 0 OR notes IS NOT NULL)""",
+                guild_id,
+            )
+            self._non_default.setdefault(guild_id, set()).update(record.get("user_id") for record in records)
+            self._loaded_guilds.add(guild_id)
+        return self._non_default[guild_id]
+
     async def update_user(self, user: User):
         """
         Takes an instance of GlobalConfig.User and tries to either update or create a new user entry if one does not exist already
         """
 
         try:
-            user.flags = json.dumps(user.flags) if user.flags else None
             await self.bot.pool.execute(
                 """
             INSERT INTO users (user_id, guild_id, flags, warns, notes) 
@@ -55,7 +189,7 @@ class ConfigHandler:
             UPDATE SET flags = $3, warns = $4,notes = $5""",
                 user.user_id,
                 user.guild_id,
-                user.flags,
+                json.dumps(user.flags) if user.flags else None,
                 user.warns,
                 user.notes,
             )
@@ -63,12 +197,26 @@ class ConfigHandler:
             logging.warning(
                 "Trying to update a guild db_user whose guild no longer exists. This could be due to pending timers."
             )
+            return
+
+        self._invalidate_user(user.user_id, user.guild_id, non_default=not self._is_default(user))
+        self._users[(user.user_id, user.guild_id)] = self._copy_user(user)
+        self._set_pending_timeout(user.user_id, user.guild_id, (user.flags or {}).get("timeout_on_join"))
 
     async def get_user(self, user_id, guild_id) -> User:
         """
         Gets an instance of GlobalConfig.User that contains basic information about the user in relation to a guild
-        Returns None if not found
+        Users without any stored data are returned with default values
         """
+        key = (user_id, guild_id)
+        if key in self._users:
+            return self._copy_user(self._users[key])
+
+        non_default = await self._load_guild(guild_id)
+        if user_id not in non_default:
+            return User(user_id=user_id, guild_id=guild_id, flags={})
+
+        generation = self._generations.get(key, 0)
         result = await self.bot.pool.fetch(
             """SELECT * FROM users WHERE user_id = $1 AND guild_id = $2""",
             user_id,
@@ -82,11 +230,116 @@ class ConfigHandler:
                 warns=result[0].get("warns"),
                 notes=result[0].get("notes"),
             )
-            return user
+            if self._generations.get(key, 0) == generation:  # Do not cache a row that changed during the fetch
+                self._users[key] = user
+            return self._copy_user(user)
         else:
-            user = User(user_id=user_id, guild_id=guild_id)  # Generate a new db user if none exists
-            await self.update_user(user)
-            return user
+            non_default.discard(user_id)
+            return User(user_id=user_id, guild_id=guild_id, flags={})
+
+    def _invalidate_user(self, user_id: int, guild_id: int, non_default: bool = False) -> None:
+        """Drop a cached user after it was changed directly in the database."""
+        key = (user_id, guild_id)
+        self._users.pop(key, None)
+        self._generations[key] = self._generations.get(key, 0) + 1
+        if non_default:
+            self._mark_non_default(user_id, guild_id)
+
+    async def increment_warns(self, user_id: int, guild_id: int) -> int:
+        """
+        Atomically add a warning to a user, creating the user if needed. Returns the new amount of warnings.
+        """
+        warns = await self.bot.pool.fetchval(
+            """
+        INSERT INTO users (user_id, guild_id, warns) VALUES ($1, $2, 1)
+        ON CONFLICT (user_id, guild_id) DO
+        UPDATE SET warns = users.warns + 1
+        RETURNING warns""",
+            user_id,
+            guild_id,
+        )
+        self._invalidate_user(user_id, guild_id, non_default=True)
+        return warns
+
+    async def clear_warns(self, user_id: int, guild_id: int) -> None:
+        """
+        Atomically reset the warnings of a user.
+        """
+        await self.bot.pool.execute(
+            """UPDATE users SET warns = 0 WHERE user_id = $1 AND guild_id = $2""",
+            user_id,
+            guild_id,
+        )
+        self._invalidate_user(user_id, guild_id)
+
+    async def get_notes(self, user_id: int, guild_id: int) -> List[str]:
+        """
+        Returns the moderation notes of a user, oldest first, or None if there are none.
+        """
+        return (await self.get_user(user_id, guild_id)).notes
+
+    async def append_note(self, user_id: int, guild_id: int, note: str) -> None:
+        """
+        Atomically append a note to a user's notes, creating the user if needed.
+        """
+        await self.bot.pool.execute(
+            """
+        INSERT INTO users (user_id, guild_id, notes) VALUES ($1, $2, ARRAY[$3::text])
+        ON CONFLICT (user_id, guild_id) DO
+        UPDATE SET notes = array_append(users.notes, $3::text)""",
+            user_id,
+            guild_id,
+            note,
+        )
+        self._invalidate_user(user_id, guild_id, non_default=True)
+
+    async def remove_note(self, user_id: int, guild_id: int, note_id: int) -> None:
+        """
+        Atomically remove a note from a user's notes by its zero-based position.
+        """
+        await self.bot.pool.execute(
+            """
+        UPDATE users SET notes = notes[:$3] || notes[$3 + 2:]
+        WHERE user_id = $1 AND guild_id = $2 AND cardinality(notes) > $3""",
+            user_id,
+            guild_id,
+            note_id,
+        )
+        self._invalidate_user(user_id, guild_id)
+
+    async def set_user_flag(self, user_id: int, guild_id: int, flag: str, value) -> None:
+        """
+        Atomically set a single flag for a user without rewriting the others, creating the user if needed.
+        """
+        await self.bot.pool.execute(
+            """
+        INSERT INTO users (user_id, guild_id, flags) VALUES ($1, $2, json_build_object($3::text, $4::jsonb))
+        ON CONFLICT (user_id, guild_id) DO
+        UPDATE SET flags = (COALESCE(users.flags::jsonb, '{}') || jsonb_build_object($3::text, $4::jsonb))::json""",
+            user_id,
+            guild_id,
+            flag,
+            json.dumps(value),
+        )
+        self._invalidate_user(user_id, guild_id, non_default=True)
+        if flag == "timeout_on_join":
+            self._set_pending_timeout(user_id, guild_id, value)
+
+    async def del_user_flag(self, user_id: int, guild_id: int, flag: str) -> None:
+        """
+        Atomically remove a single flag from a user. Flags are set to NULL if none remain.
+        """
+        await self.bot.pool.execute(
+            """
+        UPDATE users SET flags = NULLIF(users.flags::jsonb - $3::text, '{}')::json
+        WHERE user_id = $1 AND guild_id = $2""",
+            user_id,
+            guild_id,
+            flag,
+        )
+        self._invalidate_user(user_id, guild_id)
+        if flag == "timeout_on_join":
+            self._set_pending_timeout(user_id, guild_id, None)
 
     async def get_all_guild_users(self, guild_id) -> List[User]:
         """
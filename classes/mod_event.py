@@ -0,0 +1,16 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class ModEvent:
+    """
+    Represents a single moderation action stored in the mod_events table.
+    """
+
+    guild_id: int
+    target_id: int
+    action: str  # e.g. warn, warn_clear, note, kick, ban, unban, timeout, timeout_remove
+    moderator_id: int = None  # None if the moderator is unknown
+    reason: str = None
+    created_at: int = None  # Unix timestamp, filled in on record if not set
+    id: int = None  # Assigned by the database
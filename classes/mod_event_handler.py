@@ -0,0 +1,117 @@
+import logging
+import time
+from typing import List
+
+import asyncpg
+
+from classes.mod_event import ModEvent
+
+logger = logging.getLogger(__name__)
+
+MOD_EVENT_COLUMNS = ["guild_id", "target_id", "moderator_id", "action", "reason", "created_at"]
+
+
+class ModEventHandler:
+    """
+    A class for common database operations regarding the append-only moderation event log.
+    Events are buffered and written in bulk, reads flush the buffer first so they are always up to date.
+    """
+
+    def __init__(self, bot, max_buffer: int = 100):
+        self.bot = bot
+        self.max_buffer = max_buffer
+        self.buffer: List[ModEvent] = []
+
+    async def record(self, event: ModEvent):
+        """
+        Queue a moderation event to be written, writing the buffer out if it is full.
+        """
+        if event.created_at is None:
+            event.created_at = round(time.time())
+        self.buffer.append(event)
+        if len(self.buffer) >= self.max_buffer:
+            await self.flush()
+
+    async def add_many(self, events: List[ModEvent]):
+        """
+        Insert many moderation events at once, using COPY.
+        """
+        if not events:
+            return
+
+        records = [
+            (
+                event.guild_id,
+                event.target_id,
+                event.moderator_id,
+                event.action,
+                event.reason,
+                event.created_at if event.created_at is not None else round(time.time()),
+            )
+            for event in events
+        ]
+        await self.bot.pool.copy_records_to_table("mod_events", records=records, columns=MOD_EVENT_COLUMNS)
+
+    async def flush(self):
+        """
+        Write all buffered events to the database.
+        """
+        if not self.buffer:
+            return
+
+        events, self.buffer = self.buffer, []
+        try:
+            await self.add_many(events)
+        except asyncpg.exceptions.ForeignKeyViolationError:
+            logger.warning("Trying to record moderation events for a guild that no longer exists, dropping them.")
+            await self.add_many([event for event in events if self.bot.get_guild(event.guild_id)])
+        except Exception:
+            self.buffer = events + self.buffer  # Retry with the next flush
+            raise
+
+    async def get(
+        self,
+        guild_id: int,
+        target_id: int = None,
+        moderator_id: int = None,
+        action: str = None,
+        before: int = None,
+        limit: int = 50,
+    ) -> List[ModEvent]:
+        """
+        Returns the newest moderation events of a guild matching all given criteria, newest first.
+        Pass the created_at of the last event as before to get the next page.
+        """
+        await self.flush()
+
+        conditions = ["guild_id = $1"]
+        args = [guild_id]
+        for column, value in (
+            ("target_id", target_id),
+            ("moderator_id", moderator_id),
+            ("action", action),
+        ):
+            if value is not None:
+                args.append(value)
+                conditions.append(f"{column} = ${len(args)}")
+        if before is not None:
+            args.append(before)
+            conditions.append(f"created_at < ${len(args)}")
+        args.append(limit)
+
+        results = await self.bot.pool.fetch(
+            f"""SELECT * FROM mod_events WHERE {' AND '.join(conditions)} ORDER BY created_at DESC, id DESC LIMIT ${len(args)}""",
+            *args,
+        )
+        return [
+            ModEvent(
+                id=result.get("id"),
+                guild_id=result.get("guild_id"),
+                target_id=result.get("target_id"),
+                moderator_id=result.get("moderator_id"),
+                action=result.get("action"),
+                reason=result.get("reason"),
+                created_at=result.get("created_at"),
+            )
+            for result in results
+        ]
@@ -0,0 +1,48 @@
+from dataclasses import dataclass, field
+from typing import List, Set
+
+
+@dataclass
+class ModJob:
+    """
+    Represents a long-running bulk moderation action stored in the mod_jobs table.
+    """
+
+    guild_id: int
+    channel_id: int  # Where progress is reported
+    moderator_id: int
+    action: str  # e.g. ban
+    reason: str
+    targets: List[int]
+    completed: Set[int] = field(default_factory=set)  # Targets the action succeeded on
+    failed: Set[int] = field(default_factory=set)  # Targets the action failed on, not retried on resume
+    cursor: int = 0  # Every target before this index has been processed
+    status: str = "running"  # running, cancelled, finished
+    processed_seconds: float = 0  # Time spent working on the job, excluding downtime
+    created_at: int = None  # Unix timestamp
+    updated_at: int = None  # Unix timestamp
+    id: int = None  # Assigned by the database
+
+    @property
+    def processed(self) -> int:
+        return len(self.completed) + len(self.failed)
+
+    @property
+    def throughput(self) -> float:
+        """Targets processed per second of work."""
+        return self.processed / self.processed_seconds if self.processed_seconds > 0 else 0.0
+
+    def advance_cursor(self) -> None:
+        """Move the cursor past every target that has been processed."""
+        while self.cursor < len(self.targets) and (
+            self.targets[self.cursor] in self.completed or self.targets[self.cursor] in self.failed
+        ):
+            self.cursor += 1
+
+    def remaining(self) -> List[int]:
+        """Targets that have not been processed yet, in order."""
+        return [
+            target_id
+            for target_id in self.targets[self.cursor :]
+            if target_id not in self.completed and target_id not in self.failed
+        ]
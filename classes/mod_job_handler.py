@@ -0,0 +1,98 @@
+import logging
+import time
+from typing import List, Optional
+
+from classes.mod_job import ModJob
+
+logger = logging.getLogger(__name__)
+
+
+class ModJobHandler:
+    """
+    A class for common database operations regarding persisted bulk moderation jobs.
+    Progress is checkpointed every checkpoint_every processed targets, so a restart loses at most that many
+    results, which are then simply retried on resume.
+    """
+
+    def __init__(self, bot, checkpoint_every: int = 25):
+        self.bot = bot
+        self.checkpoint_every = checkpoint_every
+
+    def _from_record(self, record) -> ModJob:
+        return ModJob(
+            id=record.get("id"),
+            guild_id=record.get("guild_id"),
+            channel_id=record.get("channel_id"),
+            moderator_id=record.get("moderator_id"),
+            action=record.get("action"),
+            reason=record.get("reason"),
+            targets=list(record.get("targets")),
+            completed=set(record.get("completed")),
+            failed=set(record.get("failed")),
+            cursor=record.get("cursor"),
+            status=record.get("status"),
+            processed_seconds=record.get("processed_seconds"),
+            created_at=record.get("created_at"),
+            updated_at=record.get("updated_at"),
+        )
+
+    async def create(self, job: ModJob) -> ModJob:
+        """
+        Persist a new job, assigning its id.
+        """
+        job.created_at = job.updated_at = round(time.time())
+        job.id = await self.bot.pool.fetchval(
+            """
+            INSERT INTO mod_jobs (guild_id, channel_id, moderator_id, action, reason, targets, status, created_at, updated_at)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $8)
+            RETURNING id
+            """,
+            job.guild_id,
+            job.channel_id,
+            job.moderator_id,
+            job.action,
+            job.reason,
+            job.targets,
+            job.status,
+            job.created_at,
+        )
+        return job
+
+    async def checkpoint(self, job: ModJob) -> None:
+        """
+        Save the progress & status of a job.
+        """
+        job.advance_cursor()
+        job.updated_at = round(time.time())
+        await self.bot.pool.execute(
+            """
+            UPDATE mod_jobs SET completed = $1, failed = $2, cursor = $3, status = $4, processed_seconds = $5, updated_at = $6
+            WHERE id = $7
+            """,
+            list(job.completed),
+            list(job.failed),
+            job.cursor,
+            job.status,
+            job.processed_seconds,
+            job.updated_at,
+            job.id,
+        )
+
+    async def get(self, guild_id: int, job_id: int) -> Optional[ModJob]:
+        """
+        Returns a job of a guild by its id, if it exists.
+        """
+        record = await self.bot.pool.fetchrow(
+            """SELECT * FROM mod_jobs WHERE guild_id = $1 AND id = $2""", guild_id, job_id
+        )
+        if record:
+            return self._from_record(record)
+
+    async def get_all(self, guild_id: int, limit: int = 10) -> List[ModJob]:
+        """
+        Returns the newest jobs of a guild, newest first.
+        """
+        records = await self.bot.pool.fetch(
+            """SELECT * FROM mod_jobs WHERE guild_id = $1 ORDER BY id DESC LIMIT $2""", guild_id, limit
+        )
+        return [self._from_record(record) for record in records]
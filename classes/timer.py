@@ -14,3 +14,4 @@ class Timer:
     event: str
     expires: int
     notes: str
+    recurring_in: int = None  # Seconds between runs, None if the timer only fires once
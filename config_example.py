@@ -12,4 +12,6 @@ config = {
     "home_guild": 123456789,  # ID of guild to send debug info to (optional)
     "error_logging_channel": 123456789,  # Sends tracebacks of command errors here (optional)
     "db_backup_channel": 123456789,  # Sends daily database backup files here (optional)
+    # Write message contents that no longer fit in memory to the database, for logging older deletions & edits (optional)
+    "message_store_spill": False,
 }
@@ -67,6 +67,9 @@ try:
                         ON DELETE CASCADE
                 )"""
             )
+            await con.execute(
+                """CREATE INDEX IF NOT EXISTS users_timeout_on_join_idx ON public.users ((flags->>'timeout_on_join')) WHERE (flags->>'timeout_on_join') IS NOT NULL"""
+            )
             # guild_id is always needed in table, so I just hacked it in c:
             # the table is not guild-specific though
             await con.execute(
@@ -112,12 +115,15 @@ try:
                         event text NOT NULL,
                         expires bigint NOT NULL,
                         notes text,
+                        recurring_in bigint,
                         PRIMARY KEY (id),
                         FOREIGN KEY (guild_id)
                             REFERENCES global_config (guild_id)
                             ON DELETE CASCADE
                     )"""
             )
+            # Columns added after the table was first introduced
+            await con.execute("""ALTER TABLE public.timers ADD COLUMN IF NOT EXISTS recurring_in bigint""")
             await con.execute(
                 """
                     CREATE TABLE IF NOT EXISTS public.permissions
@@ -225,6 +231,9 @@ try:
                         PRIMARY KEY (id)
                     )"""
             )
+            await con.execute(
+                """CREATE INDEX IF NOT EXISTS matchmaking_listings_timestamp_idx ON public.matchmaking_listings (timestamp)"""
+            )
             await con.execute(
                 """
                     CREATE TABLE IF NOT EXISTS public.tags
@@ -252,6 +261,77 @@ try:
                             ON DELETE CASCADE
                     )"""
             )
+            await con.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS public.message_store
+                    (
+                        guild_id bigint NOT NULL,
+                        message_id bigint NOT NULL,
+                        channel_id bigint NOT NULL,
+                        author_id bigint NOT NULL,
+                        content text NOT NULL,
+                        flags integer NOT NULL DEFAULT 0,
+                        created_at bigint NOT NULL,
+                        PRIMARY KEY (message_id),
+                        FOREIGN KEY (guild_id)
+                            REFERENCES global_config (guild_id)
+                            ON DELETE CASCADE
+                    )"""
+            )
+            await con.execute(
+                """CREATE INDEX IF NOT EXISTS message_store_created_at_idx ON public.message_store (created_at)"""
+            )
+            await con.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS public.mod_events
+                    (
+                        id bigserial NOT NULL,
+                        guild_id bigint NOT NULL,
+                        target_id bigint NOT NULL,
+                        moderator_id bigint,
+                        action text NOT NULL,
+                        reason text,
+                        created_at bigint NOT NULL,
+                        PRIMARY KEY (id),
+                        FOREIGN KEY (guild_id)
+                            REFERENCES global_config (guild_id)
+                            ON DELETE CASCADE
+                    )"""
+            )
+            await con.execute(
+                """CREATE INDEX IF NOT EXISTS mod_events_target_idx ON public.mod_events (guild_id, target_id, created_at)"""
+            )
+            await con.execute(
+                """CREATE INDEX IF NOT EXISTS mod_events_moderator_idx ON public.mod_events (guild_id, moderator_id, created_at)"""
+            )
+            await con.execute(
+                """CREATE INDEX IF NOT EXISTS mod_events_action_idx ON public.mod_events (guild_id, action, created_at)"""
+            )
+            await con.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS public.mod_jobs
+                    (
+                        id serial NOT NULL,
+                        guild_id bigint NOT NULL,
+                        channel_id bigint NOT NULL,
+                        moderator_id bigint NOT NULL,
+                        action text NOT NULL,
+                        reason text,
+                        targets bigint[] NOT NULL,
+                        completed bigint[] NOT NULL DEFAULT '{}',
+                        failed bigint[] NOT NULL DEFAULT '{}',
+                        cursor integer NOT NULL DEFAULT 0,
+                        status text NOT NULL DEFAULT 'running',
+                        processed_seconds double precision NOT NULL DEFAULT 0,
+                        created_at bigint NOT NULL,
+                        updated_at bigint NOT NULL,
+                        PRIMARY KEY (id),
+                        FOREIGN KEY (guild_id)
+                            REFERENCES global_config (guild_id)
+                            ON DELETE CASCADE
+                    )"""
+            )
+            await con.execute("""CREATE INDEX IF NOT EXISTS mod_jobs_guild_idx ON public.mod_jobs (guild_id, id)""")
             await con.execute(
                 """
                     CREATE TABLE IF NOT EXISTS public.ktp
@@ -9,6 +9,7 @@ from classes.bot import SnedBot
 from discord.ext import commands
 
 from classes.errors import UserInputError
+from extensions.utils.persistent_views import PersistentViewRegistry
 
 
 async def has_owner(ctx):
@@ -242,6 +243,7 @@ class Events(commands.Cog):
             "Green": discord.ButtonStyle.success,
             "Red": discord.ButtonStyle.danger,
         }
+        self.views = PersistentViewRegistry(bot, self.view_signature)
 
     async def cog_check(self, ctx):
         return await ctx.bot.custom_checks.has_permissions(
@@ -252,33 +254,41 @@ class Events(commands.Cog):
     async def on_ready(self):
         await self.events_init()
 
+    def view_signature(self, record) -> tuple:
+        """The parts of an event that its buttons are built from, sign-ups do not require a new view"""
+        return (
+            record.get("entry_id"),
+            tuple(
+                (key, data["emoji"], data["buttonstyle"], data["buttonlabel"])
+                for key, data in json.loads(record.get("categories")).items()
+            ),
+        )
+
     async def events_init(self):
-        """Re-acquire all persistent buttons"""
+        """Re-acquire persistent buttons that are not registered yet, or changed since the last READY"""
         await self.bot.wait_until_ready()
         logger.info("Adding persistent views to events...")
-        async with self.bot.pool.acquire() as con:
-            records = await con.fetch("""SELECT * FROM events""")
-
-        add_to_persistent_views = {}
-
-        for record in records:
-            for key, data in json.loads(record.get("categories")).items():
-                button = SignUpCategoryButton(
-                    record.get("entry_id"),
-                    key,
-                    discord.PartialEmoji.from_str(data["emoji"]),
-                    style=self.button_styles[data["buttonstyle"]],
-                    label=data["buttonlabel"],
-                )
-                if record.get("msg_id") not in add_to_persistent_views.keys():
-                    add_to_persistent_views[record.get("msg_id")] = [button]
-                else:
-                    add_to_persistent_views[record.get("msg_id")].append(button)
 
-        for msg_id, buttons in add_to_persistent_views.items():
-            self.bot.add_view(PersistentEventView(self.bot, buttons), message_id=msg_id)
+        def build_view(records) -> PersistentEventView:
+            buttons = []
+            for record in records:
+                for key, data in json.loads(record.get("categories")).items():
+                    buttons.append(
+                        SignUpCategoryButton(
+                            record.get("entry_id"),
+                            key,
+                            discord.PartialEmoji.from_str(data["emoji"]),
+                            style=self.button_styles[data["buttonstyle"]],
+                            label=data["buttonlabel"],
+                        )
+                    )
+            return PersistentEventView(self.bot, buttons)
 
-        logger.info("Events ready!")
+        registered, total = await self.views.rehydrate(
+            """SELECT entry_id, msg_id, categories FROM events ORDER BY msg_id, entry_id""",
+            build_view,
+        )
+        logger.info(f"Events ready! Registered {registered}/{total} event views.")
 
     @commands.Cog.listener()
     async def on_event_timer_complete(self, timer):
@@ -294,6 +304,7 @@ class Events(commands.Cog):
                 return
             else:
                 await message.edit(view=None)
+                self.views.forget(message.id)
                 paginator = commands.Paginator(prefix="", suffix="")
                 paginator.add_line(f"Event **'{message.embeds[0].title}'** is starting now!\n")
                 for category, data in json.loads(record[0]["categories"]).items():
@@ -502,6 +513,7 @@ class Events(commands.Cog):
                     id,
                 )
                 await self.bot.caching.refresh(table="events", guild_id=ctx.guild.id)
+                self.views.forget(records[0]["msg_id"])
                 embed = discord.Embed(
                     title="✅ Event deleted",
                     description="Event has been successfully deleted!",
@@ -542,6 +554,7 @@ class Events(commands.Cog):
                     )
 
                 await self.bot.caching.refresh(table="events", guild_id=ctx.guild.id)
+                self.views.forget(records[0]["msg_id"])
 
                 embed = discord.Embed(
                     title="❌ Error: Not found",
@@ -652,6 +665,11 @@ class Events(commands.Cog):
                                     ctx.guild.id,
                                     records[0]["entry_id"],
                                 )
+                                self.views.register(
+                                    event_message.id,
+                                    [{"entry_id": records[0]["entry_id"], "categories": json.dumps(categories)}],
+                                    event_view,
+                                )
 
                                 embed = discord.Embed(
                                     title=f"🛠️ Editing {event_embed.title}",
@@ -710,6 +728,11 @@ class Events(commands.Cog):
                                     ctx.guild.id,
                                     records[0]["entry_id"],
                                 )
+                                self.views.register(
+                                    event_message.id,
+                                    [{"entry_id": records[0]["entry_id"], "categories": json.dumps(categories)}],
+                                    event_view,
+                                )
                                 embed = discord.Embed(
                                     title=f"🛠️ Editing {event_embed.title}",
                                     description="✅ Category removed!",
@@ -738,6 +761,7 @@ class Events(commands.Cog):
                                 records[0]["entry_id"],
                             )
                         await self.bot.caching.refresh(table="events", guild_id=ctx.guild.id)
+                        self.views.forget(event_message.id)
                         embed = discord.Embed(
                             title=f"🛠️ Editing {event_embed.title}",
                             description="✅ Event deleted!",
@@ -1095,6 +1119,7 @@ class Events(commands.Cog):
                 json.dumps(categories),
             )
         await self.bot.caching.refresh(table="events", guild_id=ctx.guild.id)
+        self.views.register(event_msg.id, [{"entry_id": entry_id, "categories": json.dumps(categories)}], view)
         await self.bot.get_cog("Timers").create_timer(
             event_expiry,
             event="event",
@@ -1,3 +1,4 @@
+import dataclasses
 import json
 import logging
 
@@ -46,11 +47,7 @@ class IpcRoutes(commands.Cog):
         If there is no entry for a given module, then it falls back to True.
 
         """
-        record = await self.bot.caching.get(table="modules", guild_id=guild_id, module_name=module_name)
-        if record:
-            return record[0]["is_enabled"]
-        else:
-            return True
+        return await self.bot.global_config.is_module_enabled(guild_id, module_name)
 
     @ipc.server.route()
     async def check_for_guild(self, data) -> bool:
@@ -125,22 +122,49 @@ class IpcRoutes(commands.Cog):
         """
         Function to toggle a module over IPC.
         """
-        guild_id = data.guild_id
-        module_name = data.module_name
-        is_enabled = data.is_enabled
+        await self.bot.global_config.set_modules(data.guild_id, {data.module_name: data.is_enabled})
 
-        await self.bot.pool.execute(
-            """
-        INSERT INTO modules (guild_id, module_name, is_enabled)
-        VALUES ($1, $2, $3)
-        ON CONFLICT (guild_id, module_name) DO
-        UPDATE SET is_enabled = $3
-        """,
-            guild_id,
-            module_name,
-            is_enabled,
+    @ipc.server.route()
+    async def set_modules(self, data) -> None:
+        """
+        Function to toggle multiple modules at once over IPC.
+        data.modules maps module names to their new state.
+        """
+        await self.bot.global_config.set_modules(data.guild_id, data.modules)
+
+    @ipc.server.route()
+    async def get_timer_metrics(self, data) -> dict:
+        """
+        Returns scheduler statistics for the dashboard,
+        such as pending timers, dispatch lag and listener execution times.
+        """
+        return await self.bot.get_cog("Timers").get_metrics()
+
+    @ipc.server.route()
+    async def get_mod_events(self, data) -> list:
+        """
+        Returns moderation history for the dashboard, newest first.
+        Optionally filtered by target, moderator or action, pass before to paginate.
+        """
+        events = await self.bot.get_cog("Moderation").mod_events.get(
+            data.guild_id,
+            target_id=getattr(data, "target_id", None),
+            moderator_id=getattr(data, "moderator_id", None),
+            action=getattr(data, "action", None),
+            before=getattr(data, "before", None),
+            limit=min(getattr(data, "limit", 50), 100),
         )
-        await self.bot.caching.refresh(table="modules", guild_id=guild_id)
+        return [dataclasses.asdict(event) for event in events]
+
+    @ipc.server.route()
+    async def get_log_queue_stats(self, data) -> dict:
+        """Returns the depth of the outgoing log queues and delivery counters."""
+        return self.bot.get_cog("Logging").get_log_queue_stats()
+
+    @ipc.server.route()
+    async def get_role_button_stats(self, data) -> dict:
+        """Returns the depth of the role-button edit queues, counters and click-to-edit latencies."""
+        return self.bot.get_cog("Role-Buttons").role_edits.get_stats()
 
     @ipc.server.route()
     async def get_moderation_settings(self, data) -> dict:
@@ -5,7 +5,7 @@ import uuid
 from dataclasses import dataclass
 
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 
 from classes.bot import SnedBot
 
@@ -139,6 +139,16 @@ class Listings:
             id,
         )
 
+    async def delete_expired(self, max_age: int) -> list:
+        """Delete all listings older than max_age seconds in one statement, returns the IDs of the deleted listings."""
+        results = await self.bot.pool.fetch(
+            """
+        DELETE FROM matchmaking_listings WHERE timestamp < $1 RETURNING id
+        """,
+            int(round(time.time())) - max_age,
+        )
+        return [result.get("id") for result in results]
+
 
 class Matchmaking(commands.Cog):
     def __init__(self, bot):
@@ -147,10 +157,18 @@ class Matchmaking(commands.Cog):
         self.listings = Listings(bot)
         self._ = self.bot.get_localization("matchmaking", self.bot.lang)
 
-        self.delExpiredListings.start()  # pylint: disable=<no-member>
+        timers = self.bot.get_cog("Timers")
+        if timers:
+            self.register_recurring_jobs(timers)
 
     def cog_unload(self):
-        self.delExpiredListings.cancel()  # pylint: disable=<no-member>
+        timers = self.bot.get_cog("Timers")
+        if timers:
+            timers.remove_recurring_job("matchmaking_expiry")
+
+    def register_recurring_jobs(self, timers) -> None:
+        """Schedule the periodic work of this cog, called again by the Timers cog whenever it is reloaded."""
+        timers.add_recurring_job("matchmaking_expiry", self.delExpiredListings, 3600.0, jitter=300.0)
 
     @commands.command(name="matchmakingconf", help="Helps set up matchmaking")
     @commands.check(is_anno_guild)
@@ -1156,16 +1174,12 @@ class Matchmaking(commands.Cog):
             embed = self.bot.add_embed_footer(ctx, embed)
             await ctx.channel.send(embed=embed)
 
-    # Remove listings older than a week from the database
-    @tasks.loop(seconds=3600.0)
+    # Remove listings older than a week from the database, scheduled hourly by the Timers extension
     async def delExpiredListings(self):
         await self.bot.wait_until_ready()
-        listings = await self.listings.retrieve_all()
-        if listings and len(listings) != 0:
-            for listing in listings:
-                if (int(round(time.time())) - listing.timestamp) > 604800:
-                    await self.listings.delete(listing.id)
-                    logger.info("Deleted listing {ID} from database.".format(ID=listing.id))
+        deleted_ids = await self.listings.delete_expired(604800)
+        for listing_id in deleted_ids:
+            logger.info("Deleted listing {ID} from database.".format(ID=listing_id))
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload):
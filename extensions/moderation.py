@@ -1,5 +1,4 @@
 import argparse
-import asyncio
 import datetime
 import functools
 import io
@@ -7,17 +6,28 @@ import logging
 import re
 import shlex
 from dataclasses import dataclass
-from typing import Union
+from typing import Dict, List, Optional, Union
 
 import discord
 from classes.bot import SnedBot
 from classes.errors import UserInputError
+from classes.mod_event import ModEvent
+from classes.mod_event_handler import ModEventHandler
+from classes.mod_job import ModJob
+from classes.mod_job_handler import ModJobHandler
 from discord.ext import commands
+from extensions.utils.bulk_actions import BulkActionExecutor, BulkActionReport
+from extensions.utils.member_index import MemberFilter, MemberIndex
+from extensions.utils.purge import PurgeEngine, PurgeFilter, PurgeResult
 
 from classes import components
 
 logger = logging.getLogger(__name__)
 
+MASSBAN_LIMIT = 1000
+PURGE_LIMIT = 1000
+BULK_BAN_CONCURRENCY = 5  # Ban requests in flight at once, they all share the same rate limit bucket
+
 
 class ArgParser(argparse.ArgumentParser):
     def error(self, message):  # So it doesn't throw a SystemExit
@@ -59,6 +69,23 @@ class Moderation(commands.Cog):
         self.bot = bot
         self.max_timeout_seconds = 2246400  # Seconds to break timeouts up into
         self._ = self.bot.get_localization("moderation", self.bot.lang)
+        self.mod_events = ModEventHandler(bot)
+        self.mod_jobs = ModJobHandler(bot)
+        self.active_jobs: Dict[int, BulkActionExecutor] = {}  # job_id -> executor of jobs running in this process
+        self.member_index = MemberIndex()
+        timers = self.bot.get_cog("Timers")
+        if timers:
+            self.register_recurring_jobs(timers)
+
+    def cog_unload(self):
+        timers = self.bot.get_cog("Timers")
+        if timers:
+            timers.remove_recurring_job("mod_events_flush")
+        self.bot.loop.create_task(self.mod_events.flush())
+
+    def register_recurring_jobs(self, timers) -> None:
+        """Schedule the periodic work of this cog, called again by the Timers cog whenever it is reloaded."""
+        timers.add_recurring_job("mod_events_flush", self.mod_events.flush, 5.0, first_run=5.0)
 
     async def cog_check(self, ctx) -> bool:
         return await self.bot.custom_checks.module_is_enabled(ctx, "moderation")
@@ -201,9 +228,7 @@ class Moderation(commands.Cog):
         Warn a member, increasing their warning count and logging it.
         Requires userlog extension for full functionality.
         """
-        db_user = await self.bot.global_config.get_user(member.id, ctx.guild.id)
-        db_user.warns += 1
-        await self.bot.global_config.update_user(db_user)  # Update warns for user by incrementing it
+        warns = await self.bot.global_config.increment_warns(member.id, ctx.guild.id)
         if reason is None:
             embed = discord.Embed(
                 title="⚠️ " + self._("Warning issued"),
@@ -214,7 +239,7 @@ class Moderation(commands.Cog):
             )
             warnembed = discord.Embed(
                 title="⚠️ Warning issued.",
-                description=f"{member.mention} has been warned by {moderator.mention}.\n**Warns:** {db_user.warns}\n\n[Jump!]({ctx.message.jump_url})",
+                description=f"{member.mention} has been warned by {moderator.mention}.\n**Warns:** {warns}\n\n[Jump!]({ctx.message.jump_url})",
                 color=self.bot.warn_color,
             )
         else:
@@ -227,7 +252,7 @@ class Moderation(commands.Cog):
             )
             warnembed = discord.Embed(
                 title="⚠️ Warning issued.",
-                description=f"{member.mention} has been warned by {moderator.mention}.\n**Warns:** {db_user.warns}\n**Reason:** ```{reason}```\n[Jump!]({ctx.message.jump_url})",
+                description=f"{member.mention} has been warned by {moderator.mention}.\n**Warns:** {warns}\n**Reason:** ```{reason}```\n[Jump!]({ctx.message.jump_url})",
                 color=self.bot.warn_color,
             )
         try:
@@ -236,7 +261,14 @@ class Moderation(commands.Cog):
         except (AttributeError, discord.Forbidden):
             pass
         reason = self.format_reason(reason)
-        await self.add_note(member.id, ctx.guild.id, f"⚠️ **Warned by {moderator}:** {reason}")
+        await self.add_note(
+            member.id,
+            ctx.guild.id,
+            f"⚠️ **Warned by {moderator}:** {reason}",
+            action="warn",
+            moderator_id=moderator.id,
+            reason=reason,
+        )
 
     @commands.Cog.listener()
     async def on_timeout_extend_timer_complete(self, timer):
@@ -246,72 +278,68 @@ class Moderation(commands.Cog):
         expiry = int(timer.notes)
         if member:
 
-            await self.bot.get_cog("Logging").freeze_logging(timer.guild_id)
-            if expiry - discord.utils.utcnow().timestamp() > self.max_timeout_seconds:
-
-                await self.bot.get_cog("Timers").create_timer(
-                    discord.utils.utcnow() + datetime.timedelta(seconds=self.max_timeout_seconds),
-                    "timeout_extend",
-                    timer.guild_id,
-                    member.id,
-                    notes=timer.notes,
-                )
-                await member.timeout(
-                    discord.utils.utcnow() + datetime.timedelta(seconds=self.max_timeout_seconds),
-                    reason="Automatic timeout extension applied.",
-                )
+            async with self.bot.get_cog("Logging").freeze_logging(timer.guild_id, ["timeout"]):
+                if expiry - discord.utils.utcnow().timestamp() > self.max_timeout_seconds:
 
-            else:
-                timeout_for = discord.utils.utcnow() + datetime.timedelta(
-                    seconds=expiry - round(discord.utils.utcnow().timestamp())
-                )
-                await member.timeout(timeout_for, reason="Automatic timeout extension applied.")
+                    await self.bot.get_cog("Timers").create_timer(
+                        discord.utils.utcnow() + datetime.timedelta(seconds=self.max_timeout_seconds),
+                        "timeout_extend",
+                        timer.guild_id,
+                        member.id,
+                        notes=timer.notes,
+                    )
+                    await member.timeout(
+                        discord.utils.utcnow() + datetime.timedelta(seconds=self.max_timeout_seconds),
+                        reason="Automatic timeout extension applied.",
+                    )
 
-            await self.bot.get_cog("Logging").unfreeze_logging(timer.guild_id)
+                else:
+                    timeout_for = discord.utils.utcnow() + datetime.timedelta(
+                        seconds=expiry - round(discord.utils.utcnow().timestamp())
+                    )
+                    await member.timeout(timeout_for, reason="Automatic timeout extension applied.")
 
         else:
-            db_user = await self.bot.global_config.get_user(timer.user_id, timer.guild_id)
-            if "timeout_on_join" not in db_user.flags.keys():
-                db_user.flags["timeout_on_join"] = expiry
-                await self.bot.global_config.update_user(db_user)
+            if await self.bot.global_config.get_pending_timeout(timer.user_id, timer.guild_id) is None:
+                await self.bot.global_config.set_user_flag(timer.user_id, timer.guild_id, "timeout_on_join", expiry)
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
 
-        db_user = await self.bot.global_config.get_user(member.id, member.guild.id)
+        self.member_index.add_joiner(member)
 
-        if db_user.flags and "timeout_on_join" in db_user.flags.keys():
+        expiry = await self.bot.global_config.get_pending_timeout(member.id, member.guild.id)
 
-            expiry = db_user.flags["timeout_on_join"]
+        if expiry is not None:
 
             if expiry - discord.utils.utcnow().timestamp() > 0:
 
-                await self.bot.get_cog("Logging").freeze_logging(member.guild.id)
+                async with self.bot.get_cog("Logging").freeze_logging(member.guild.id, ["timeout"]):
 
-                if expiry - discord.utils.utcnow().timestamp() > self.max_timeout_seconds:
+                    if expiry - discord.utils.utcnow().timestamp() > self.max_timeout_seconds:
 
-                    await self.bot.get_cog("Timers").create_timer(
-                        discord.utils.utcnow() + datetime.timedelta(seconds=self.max_timeout_seconds),
-                        "timeout_extend",
-                        member.guild.id,
-                        member.id,
-                        notes=str(expiry),
-                    )
-                    await member.timeout(
-                        discord.utils.utcnow() + datetime.timedelta(seconds=self.max_timeout_seconds),
-                        reason="Automatic timeout extension applied.",
-                    )
-
-                else:
-                    await member.timeout(expiry, reason="Automatic timeout extension applied.")
+                        await self.bot.get_cog("Timers").create_timer(
+                            discord.utils.utcnow() + datetime.timedelta(seconds=self.max_timeout_seconds),
+                            "timeout_extend",
+                            member.guild.id,
+                            member.id,
+                            notes=str(expiry),
+                        )
+                        await member.timeout(
+                            discord.utils.utcnow() + datetime.timedelta(seconds=self.max_timeout_seconds),
+                            reason="Automatic timeout extension applied.",
+                        )
 
-                await self.bot.get_cog("Logging").unfreeze_logging(member.guild.id)
+                    else:
+                        await member.timeout(expiry, reason="Automatic timeout extension applied.")
 
-            db_user.flags.pop("timeout_on_join")
-            await self.bot.global_config.update_user(db_user)
+            await self.bot.global_config.del_user_flag(member.id, member.guild.id, "timeout_on_join")
 
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.roles != after.roles:
+            self.member_index.update(after)
+
         if before.communication_disabled_until != after.communication_disabled_until:
             if (
                 after.communication_disabled_until is None
@@ -330,6 +358,19 @@ class Moderation(commands.Cog):
                     for record in records:
                         await timer_cog.cancel_timer(record.get("id"), after.guild.id)
 
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        self.member_index.remove(member.guild.id, member.id)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before: discord.User, after: discord.User):
+        if before.name != after.name or before.avatar != after.avatar or before.discriminator != after.discriminator:
+            self.member_index.update_user(after)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.member_index.forget_guild(guild.id)
+
     async def timeout(
         self,
         ctx,
@@ -488,26 +529,36 @@ class Moderation(commands.Cog):
 
     async def get_notes(self, user_id: int, guild_id: int):
         """Returns a list of the user's notes, oldest go first."""
-        db_user = await self.bot.global_config.get_user(user_id, guild_id)
-        return db_user.notes
+        return await self.bot.global_config.get_notes(user_id, guild_id)
+
+    async def add_note(
+        self,
+        user_id: int,
+        guild_id: int,
+        new_note: str,
+        *,
+        action: str = "note",
+        moderator_id: int = None,
+        reason: str = None,
+    ):
+        """
+        Add a new moderation note for the specified user. Gets automatically Discord timestamped.
+        The action is also recorded as a structured moderation event.
+        """
+        await self.mod_events.record(
+            ModEvent(guild_id=guild_id, target_id=user_id, action=action, moderator_id=moderator_id, reason=reason)
+        )
 
-    async def add_note(self, user_id: int, guild_id: int, new_note: str):
-        """Add a new moderation note for the specified user. Gets automatically Discord timestamped."""
         if len(new_note) > 256:
             new_note = new_note[:250] + "..."
 
-        db_user = await self.bot.global_config.get_user(user_id, guild_id)
-        notes = db_user.notes if db_user.notes else []
-        notes.append(f"{discord.utils.format_dt(discord.utils.utcnow(), style='d')}: {new_note}")
-        db_user.notes = notes
-        await self.bot.global_config.update_user(db_user)
+        await self.bot.global_config.append_note(
+            user_id, guild_id, f"{discord.utils.format_dt(discord.utils.utcnow(), style='d')}: {new_note}"
+        )
 
     async def del_note(self, user_id: int, guild_id: int, note_id: int):
         """Remove a moderation note by ID from the specified user."""
-        db_user = await self.bot.global_config.get_user(user_id, guild_id)
-        if note_id < len(db_user.notes):
-            db_user.notes.pop(note_id)
-        await self.bot.global_config.update_user(db_user)
+        await self.bot.global_config.remove_note(user_id, guild_id, note_id)
 
     @commands.group(
         name="journal",
@@ -562,7 +613,9 @@ class Moderation(commands.Cog):
     @commands.guild_only()
     async def notes_add_cmd(self, ctx, user: discord.User, *, note: str):
         try:
-            await self.add_note(user.id, ctx.guild.id, f"💬 **Note by {ctx.author}:** {note}")
+            await self.add_note(
+                user.id, ctx.guild.id, f"💬 **Note by {ctx.author}:** {note}", moderator_id=ctx.author.id, reason=note
+            )
         except ValueError:
             embed = discord.Embed(
                 title="❌ " + self._("Journal entry too long"),
@@ -611,9 +664,7 @@ class Moderation(commands.Cog):
         """
         Clears all stored warnings for a specified user.
         """
-        db_user = await self.bot.global_config.get_user(offender.id, ctx.guild.id)
-        db_user.warns = 0
-        await self.bot.global_config.update_user(db_user)
+        await self.bot.global_config.clear_warns(offender.id, ctx.guild.id)
         if reason is None:
             embed = discord.Embed(
                 title="✅ " + self._("Warnings cleared"),
@@ -644,6 +695,9 @@ class Moderation(commands.Cog):
             offender.id,
             ctx.guild.id,
             f"⚠️ **Warnings cleared by {ctx.author}:** {reason}",
+            action="warn_clear",
+            moderator_id=ctx.author.id,
+            reason=reason,
         )
         try:
             await self.bot.get_cog("Logging").log("warn", warnembed, ctx.guild.id)
@@ -865,6 +919,9 @@ class Moderation(commands.Cog):
                 offender.id,
                 ctx.guild.id,
                 f"🔨 **Unbanned by {ctx.author}:** {raw_reason}",
+                action="unban",
+                moderator_id=ctx.author.id,
+                reason=raw_reason,
             )
 
     @commands.command(
@@ -918,6 +975,77 @@ class Moderation(commands.Cog):
             await ctx.send(embed=embed)
             raise PunishFailed
 
+    async def bulk_ban(self, ctx, user_ids: List[int], reason: str, action: str) -> BulkActionReport:
+        """
+        Ban a list of users as a persisted job, so it can be resumed if interrupted.
+        Returns a per-user report of the results.
+        """
+
+        job = ModJob(
+            guild_id=ctx.guild.id,
+            channel_id=ctx.channel.id,
+            moderator_id=ctx.author.id,
+            action=action,
+            reason=reason,
+            targets=list(dict.fromkeys(user_ids)),
+        )
+        await self.mod_jobs.create(job)
+        return await self.run_ban_job(job, ctx.guild, ctx.channel)
+
+    async def run_ban_job(
+        self, job: ModJob, guild: discord.Guild, channel: discord.abc.Messageable
+    ) -> BulkActionReport:
+        """
+        Ban the remaining targets of a job concurrently, checkpointing progress & keeping a status message
+        updated in the channel. Returns a report of the targets processed in this run.
+        """
+
+        title = job.action.capitalize()
+        embed = discord.Embed(
+            title=f"🔨 {title} in progress",
+            description=f"Banned **{len(job.completed)}/{len(job.targets)}** users.",
+            color=self.bot.warn_color,
+        )
+        embed.set_footer(text=f"Job #{job.id}")
+        status = await channel.send(embed=embed)
+
+        async def ban(user_id: int) -> None:
+            await guild.ban(discord.Object(id=user_id), reason=job.reason)
+
+        async def on_result(user_id: int, error: Optional[str]) -> None:
+            if error is None:
+                job.completed.add(user_id)
+            else:
+                job.failed.add(user_id)
+            if executor.report.done % self.mod_jobs.checkpoint_every == 0:
+                job.processed_seconds = processed_seconds + executor.report.elapsed
+                await self.mod_jobs.checkpoint(job)
+
+        async def progress(report: BulkActionReport) -> None:
+            if report.finished_at:
+                embed.title = f"🔨 {title} cancelled" if report.cancelled else f"🔨 {title} finished"
+            embed.description = f"Banned **{len(job.completed)}/{len(job.targets)}** users."
+            if job.failed:
+                embed.description += f"\nFailed: **{len(job.failed)}**"
+            embed.set_footer(
+                text=f"Job #{job.id} | {job.processed}/{len(job.targets)} processed | {report.throughput:.1f} users/s"
+            )
+            embed.color = self.bot.embed_green if report.finished_at else self.bot.warn_color
+            await status.edit(embed=embed)
+
+        processed_seconds = job.processed_seconds
+        executor = BulkActionExecutor(ban, concurrency=BULK_BAN_CONCURRENCY, progress=progress, on_result=on_result)
+        self.active_jobs[job.id] = executor
+        try:
+            report = await executor.run(job.remaining())
+        finally:
+            self.active_jobs.pop(job.id, None)
+
+        job.processed_seconds = processed_seconds + report.elapsed
+        job.status = "cancelled" if report.cancelled else "finished"
+        await self.mod_jobs.checkpoint(job)
+        return report
+
     @commands.command(
         help="Mass-bans a list of IDs specified.",
         description="Mass-bans a list of userIDs specified. Reason goes first, then a list of user IDs seperated by spaces.",
@@ -936,7 +1064,6 @@ class Moderation(commands.Cog):
         then communicates the results to the invoker.
         """
 
-        failed = 0
         errors = []  # Contains error messages in case of any
 
         user_ids = user_ids.strip().split(" ")
@@ -945,10 +1072,14 @@ class Moderation(commands.Cog):
             try:
                 user_ids_conv.append(int(userid))
             except ValueError:
-                failed += 1
                 if " - An invalid, non-numerical userID was provided." not in errors:
                     errors.append(" - An invalid, non-numerical userID was provided.")
 
+        user_ids_conv = list(dict.fromkeys(user_ids_conv))  # Dedupe, keeping order
+        if len(user_ids_conv) > MASSBAN_LIMIT:
+            errors.append(f" - Exceeded maximum amount ({MASSBAN_LIMIT}) of users bannable by this command.")
+            user_ids_conv = user_ids_conv[:MASSBAN_LIMIT]
+
         await ctx.channel.trigger_typing()  # Long operation, so typing is triggered
 
         embed = discord.Embed(
@@ -958,36 +1089,28 @@ class Moderation(commands.Cog):
         )
         confirm = await ctx.confirm(embed=embed, cancel_msg="Cancelling...")
         if confirm:
-            await self.bot.get_cog("Logging").freeze_logging(ctx.guild.id)
-            for i, userid in enumerate(user_ids_conv):
-
-                if i < 100:
-                    try:
-                        member = ctx.guild.get_member(userid)
-                        await ctx.guild.ban(
-                            member,
-                            reason=f"Mass-banned by {ctx.author} ({ctx.author.id}): \n{reason}",
-                        )
-                    except:
-                        failed += 1
-                        if (
-                            " - Error banning a user, userID is invalid or user is no longer member of the server."
-                            not in errors
-                        ):
-                            errors.append(
-                                " - Error banning a user, userID is invalid or user is no longer member of the server."
-                            )
-                else:
-                    failed += 1
-                    if " - Exceeded maximum amount (100) of users bannable by this command." not in errors:
-                        errors.append(" - Exceeded maximum amount (100) of users bannable by this command.")
-            await self.bot.get_cog("Logging").unfreeze_logging(ctx.guild.id)
+            async with self.bot.get_cog("Logging").freeze_logging(ctx.guild.id, ["ban", "member_leave"]) as freeze:
+                report = await self.bulk_ban(
+                    ctx, user_ids_conv, f"Mass-banned by {ctx.author} ({ctx.author.id}): \n{reason}", "massban"
+                )
+                banned = len(report.succeeded)
+                for error, amount in report.error_summary().items():
+                    errors.append(f" - {error} ({amount} users)")
+                if report.cancelled:
+                    remaining = len(user_ids_conv) - report.done
+                    errors.append(f" - The job was cancelled with {remaining} users left unprocessed.")
+
+                freeze.summary = discord.Embed(
+                    title="🔨 Massban concluded",
+                    description=f"Banned **{banned}/{len(user_ids_conv)}** users.\n**Moderator:** `{ctx.author} ({ctx.author.id})`\n**Reason:** ```{reason}```",
+                    color=self.bot.error_color,
+                )
 
-            if failed == 0:
+            if not errors:
                 embed = discord.Embed(
                     title="🔨 " + self._("Massban successful"),
                     description=self._("Successfully banned **{amount}** users.\n**Reason:** ```{reason}```").format(
-                        amount=len(user_ids_conv), reason=reason
+                        amount=banned, reason=reason
                     ),
                     color=self.bot.embed_green,
                 )
@@ -996,8 +1119,8 @@ class Moderation(commands.Cog):
                 embed = discord.Embed(
                     title="🔨 " + self._("Massban concluded with failures"),
                     description=self._("Banned **{amount}/{total}** users.\n**Reason:** ```{reason}```").format(
-                        amount=len(user_ids) - failed,
-                        total=len(user_ids),
+                        amount=banned,
+                        total=len(user_ids_conv),
                         reason=reason,
                     ),
                     color=self.bot.warn_color,
@@ -1010,7 +1133,8 @@ class Moderation(commands.Cog):
                     ),
                     color=self.bot.warn_color,
                 )
-                await ctx.send(embed=embed)
+                file = discord.File(io.BytesIO(report.to_text().encode("utf-8")), filename="massban_report.txt")
+                await ctx.send(embed=embed, file=file)
 
     @commands.command(
         help="Bans users based on criteria set. See command help for more.",
@@ -1026,6 +1150,7 @@ class Moderation(commands.Cog):
     `--joined-before` Only match users who joined before this user (Takes userID)
     `--joined-after` - Only match users who joined after this user (Takes userID)
     `--show` or `-s` - Do a dry-run and only show who would have been banned instead of banning
+    `--chunk` - Request the full member list if the criteria cannot be resolved from recent joins alone
     
     **Example:**
     
@@ -1050,6 +1175,7 @@ class Moderation(commands.Cog):
         parser.add_argument("--joined-before", type=int)
         parser.add_argument("--joined-after", type=int)
         parser.add_argument("--show", "-s", action="store_true")
+        parser.add_argument("--chunk", action="store_true")
 
         try:
             args = parser.parse_args(shlex.split(args))
@@ -1062,24 +1188,11 @@ class Moderation(commands.Cog):
             ctx.command.reset_cooldown(ctx)
             return await ctx.send(embed=embed)
 
-        to_ban = []
-
-        if ctx.guild.chunked:  # Check if members are cached or not
-            members = ctx.guild.members
-        else:
-            async with ctx.typing():
-                await ctx.guild.chunk(cache=True)
-            members = ctx.guild.members
-
-        checks = [
-            lambda member: not member.bot,  # Remove bots & deleted users
-            lambda member: member.id != ctx.author.id,
-            lambda member: member.discriminator != "0000",
-        ]
+        criteria = MemberFilter(no_avatar=args.no_avatar, no_roles=args.no_roles, exclude={ctx.author.id})
 
         if args.regex:
             try:
-                regex = re.compile(args.regex)
+                criteria.regex = re.compile(args.regex)
             except re.error as error:
                 embed = discord.Embed(
                     title="❌ Invalid regex passed",
@@ -1088,50 +1201,59 @@ class Moderation(commands.Cog):
                 )
                 ctx.command.reset_cooldown(ctx)
                 return await ctx.send(embed=embed)
-            else:
-                checks.append(lambda member, regex=regex: regex.match(member.name))
-
-        if args.no_avatar:
-            checks.append(lambda member: member.avatar is None)
-        if args.no_roles:
-            checks.append(lambda member: len(member.roles) <= 1)
 
         now = discord.utils.utcnow()
 
         if args.created:
-
-            def created(member, *, offset=now - datetime.timedelta(minutes=args.created)):
-                return member.created_at > offset
-
-            checks.append(created)
-
+            criteria.created_after = (now - datetime.timedelta(minutes=args.created)).timestamp()
         if args.joined:
+            criteria.joined_after = (now - datetime.timedelta(minutes=args.joined)).timestamp()
+
+        for user_id, attr, compare in (
+            (args.joined_after, "joined_after", max),
+            (args.joined_before, "joined_before", min),
+        ):
+            if not user_id:
+                continue
+            try:
+                member = ctx.guild.get_member(user_id) or await ctx.guild.fetch_member(user_id)
+            except discord.NotFound:
+                member = None
+            if member is None or member.joined_at is None:
+                embed = discord.Embed(
+                    title="❌ Member not found",
+                    description=f"Could not find a member with the ID `{user_id}` in this server.",
+                    color=self.bot.error_color,
+                )
+                ctx.command.reset_cooldown(ctx)
+                return await ctx.send(embed=embed)
+            current = getattr(criteria, attr)
+            joined_at = member.joined_at.timestamp()
+            setattr(criteria, attr, joined_at if current is None else compare(current, joined_at))
+
+        snapshot = await self.member_index.get(self.bot.loop, ctx.guild)
+        if snapshot is None:  # Members are not cached, try answering from the recent joiners instead
+            # An account can only have joined after it was created, so both bound how far back members must be known
+            since = max(
+                (bound for bound in (criteria.joined_after, criteria.created_after) if bound is not None), default=None
+            )
+            snapshot = self.member_index.get_recent(ctx.guild.id, since)
 
-            def joined(member, *, offset=now - datetime.timedelta(minutes=args.joined)):
-                if isinstance(member, discord.User):
-                    return True
-                else:
-                    return member.joined_at and member.joined_at > offset
-
-            checks.append(joined)
-
-        if args.joined_after:
-            joined_after = ctx.guild.get_member(int(args.joined_after))
-
-            def joined_after(member, *, joined_after=joined_after):
-                return member.joined_at and joined_after.joined_at and member.joined_at > joined_after.joined_at
-
-            checks.append(joined_after)
-        if args.joined_before:
-            joined_before = ctx.guild.get_member(int(args.joined_before))
-
-            def joined_before(member, *, joined_before=joined_before):
-                return member.joined_at and joined_before.joined_at and member.joined_at < joined_before.joined_at
+        if snapshot is None:
+            if not args.chunk:
+                embed = discord.Embed(
+                    title="❌ Member list required",
+                    description="These criteria cannot be resolved from the recently joined members alone, and the member list of this server is not cached. Use `--joined` or `--created` to narrow the search down to recent joins, or pass `--chunk` to request the full member list, which may take a while on large servers.",
+                    color=self.bot.error_color,
+                )
+                ctx.command.reset_cooldown(ctx)
+                return await ctx.send(embed=embed)
 
-            checks.append(joined_before)
+            async with ctx.typing():
+                await ctx.guild.chunk(cache=True)
+            snapshot = await self.member_index.get(self.bot.loop, ctx.guild)
 
-        # Add to to_ban list if all checks succeed
-        to_ban = {member for member in members if all(check(member) for check in checks)}
+        to_ban = await self.member_index.filter(self.bot.loop, ctx.guild.id, snapshot, criteria)
 
         if len(to_ban) == 0:
             embed = discord.Embed(
@@ -1142,10 +1264,14 @@ class Moderation(commands.Cog):
             ctx.command.reset_cooldown(ctx)
             return await ctx.send(embed=embed)
 
-        members = to_ban
-        content = [f"Total members to ban: {len(members)}\n"]
-        for member in members:
-            content.append(f"{member} ({member.id}) | Joined: {member.joined_at} | Created: {member.created_at}")
+        content = [f"Total members to ban: {len(to_ban)}\n"]
+        for member_id in to_ban:
+            row = snapshot.row(member_id)
+            if row is None:  # Left while filtering
+                continue
+            joined_at = datetime.datetime.fromtimestamp(row.joined_at, datetime.timezone.utc) if row.joined_at else None
+            created_at = datetime.datetime.fromtimestamp(row.created_at, datetime.timezone.utc)
+            content.append(f"{row.name} ({row.id}) | Joined: {joined_at} | Created: {created_at}")
         content = "\n".join(content)
         file = discord.File(io.BytesIO(content.encode("utf-8")), filename="members_to_ban.txt")
 
@@ -1171,24 +1297,16 @@ class Moderation(commands.Cog):
                 cancel_msg="Aborting...",
             )
             if confirm:
-                await self.bot.get_cog("Logging").freeze_logging(ctx.guild.id)
-                count = 0
-                for member in to_ban:
-                    try:
-                        await ctx.guild.ban(member, reason=reason)
-                    except discord.HTTPException:
-                        pass
-                    else:
-                        count += 1
-                log_embed = discord.Embed(
-                    title="🔨 Smartban concluded",
-                    description=f"Banned **{count}/{len(to_ban)}** users.\n**Moderator:** `{ctx.author} ({ctx.author.id if ctx.author else '0'})`\n**Reason:** ```{reason}```",
-                    color=self.bot.error_color,
-                )
-                file = discord.File(io.BytesIO(content.encode("utf-8")), filename="members_banned.txt")
-                await self.bot.get_cog("Logging").log("ban", log_embed, ctx.guild.id, file=file, bypass=True)
-                await asyncio.sleep(1)
-                await self.bot.get_cog("Logging").unfreeze_logging(ctx.guild.id)
+                async with self.bot.get_cog("Logging").freeze_logging(ctx.guild.id, ["ban", "member_leave"]):
+                    report = await self.bulk_ban(ctx, to_ban, reason, "smartban")
+                    count = len(report.succeeded)
+                    log_embed = discord.Embed(
+                        title="🔨 Smartban concluded",
+                        description=f"Banned **{count}/{len(to_ban)}** users.\n**Moderator:** `{ctx.author} ({ctx.author.id if ctx.author else '0'})`\n**Reason:** ```{reason}```",
+                        color=self.bot.error_color,
+                    )
+                    file = discord.File(io.BytesIO(report.to_text().encode("utf-8")), filename="members_banned.txt")
+                    await self.bot.get_cog("Logging").log("ban", log_embed, ctx.guild.id, file=file, bypass=True)
 
                 embed = discord.Embed(
                     title="✅ Smartban finished",
@@ -1197,6 +1315,109 @@ class Moderation(commands.Cog):
                 )
                 await ctx.send(embed=embed)
 
+    @commands.group(
+        name="modjobs",
+        aliases=["jobs"],
+        help="Lists bulk moderation jobs. Subcommands allow you to resume or cancel them.",
+        description="Lists the latest bulk moderation jobs (such as massbans & smartbans) of this server and their progress. Jobs interrupted by a restart can be resumed or cancelled.",
+        usage="modjobs",
+        invoke_without_command=True,
+        case_insensitive=True,
+    )
+    @commands.check(has_mod_perms)
+    @commands.has_permissions(ban_members=True)
+    @commands.guild_only()
+    async def modjobs(self, ctx):
+        jobs = await self.mod_jobs.get_all(ctx.guild.id)
+        if not jobs:
+            embed = discord.Embed(
+                title="🔨 Moderation jobs",
+                description="There are no bulk moderation jobs on this server.",
+                color=self.bot.embed_blue,
+            )
+            return await ctx.send(embed=embed)
+
+        lines = []
+        for job in jobs:
+            status = job.status
+            if status == "running" and job.id not in self.active_jobs:
+                status = "interrupted"
+            lines.append(
+                f"**#{job.id}** `{job.action}` by <@{job.moderator_id}> <t:{job.created_at}:R> - **{status}**\n"
+                f"Banned **{len(job.completed)}/{len(job.targets)}**, failed **{len(job.failed)}**, {job.throughput:.1f} users/s"
+            )
+        embed = discord.Embed(
+            title="🔨 Moderation jobs",
+            description="\n".join(lines),
+            color=self.bot.embed_blue,
+        )
+        embed.set_footer(
+            text=f"Use {ctx.prefix}modjobs resume <id> or {ctx.prefix}modjobs cancel <id> on interrupted jobs."
+        )
+        await ctx.send(embed=embed)
+
+    @modjobs.command(
+        name="resume",
+        help="Resumes an interrupted bulk moderation job.",
+        usage="modjobs resume <id>",
+    )
+    @commands.check(has_mod_perms)
+    @commands.has_permissions(ban_members=True)
+    @commands.bot_has_permissions(ban_members=True)
+    @commands.guild_only()
+    @mod_command
+    async def modjobs_resume(self, ctx, job_id: int):
+        job = await self.mod_jobs.get(ctx.guild.id, job_id)
+        if not job or job.status != "running" or job.id in self.active_jobs:
+            embed = discord.Embed(
+                title="❌ Cannot resume job",
+                description="There is no interrupted job with this ID on this server.",
+                color=self.bot.error_color,
+            )
+            return await ctx.send(embed=embed)
+
+        async with self.bot.get_cog("Logging").freeze_logging(ctx.guild.id, ["ban", "member_leave"]) as freeze:
+            report = await self.run_ban_job(job, ctx.guild, ctx.channel)
+            freeze.summary = discord.Embed(
+                title=f"🔨 {job.action.capitalize()} resumed & concluded",
+                description=f"Banned **{len(job.completed)}/{len(job.targets)}** users.\n**Moderator:** `{ctx.author} ({ctx.author.id})`\n**Reason:** ```{job.reason}```",
+                color=self.bot.error_color,
+            )
+        file = discord.File(io.BytesIO(report.to_text().encode("utf-8")), filename=f"job_{job.id}_report.txt")
+        await ctx.send(file=file)
+
+    @modjobs.command(
+        name="cancel",
+        help="Cancels a running or interrupted bulk moderation job.",
+        usage="modjobs cancel <id>",
+    )
+    @commands.check(has_mod_perms)
+    @commands.has_permissions(ban_members=True)
+    @commands.guild_only()
+    @mod_command
+    async def modjobs_cancel(self, ctx, job_id: int):
+        job = await self.mod_jobs.get(ctx.guild.id, job_id)
+        if not job or job.status != "running":
+            embed = discord.Embed(
+                title="❌ Cannot cancel job",
+                description="There is no running job with this ID on this server.",
+                color=self.bot.error_color,
+            )
+            return await ctx.send(embed=embed)
+
+        if job.id in self.active_jobs:
+            self.active_jobs[job.id].cancel()  # The job marks itself cancelled once the bans in flight finish
+        else:
+            job.status = "cancelled"
+            await self.mod_jobs.checkpoint(job)
+
+        embed = discord.Embed(
+            title="✅ Job cancelled",
+            description=f"Job **#{job.id}** has been cancelled after banning **{len(job.completed)}/{len(job.targets)}** users.",
+            color=self.bot.embed_green,
+        )
+        await ctx.send(embed=embed)
+
     @commands.Cog.listener()
     async def on_tempban_timer_complete(self, timer):
         guild = self.bot.get_guild(timer.guild_id)
@@ -1288,10 +1509,58 @@ class Moderation(commands.Cog):
             await ctx.send(embed=embed)
             raise PunishFailed
 
+    async def purge_messages(self, ctx, limit: int, purge_filter: PurgeFilter) -> None:
+        """
+        Purge messages matching the filter from the last limit messages of the channel,
+        keeping a status message updated with the progress.
+        """
+
+        if limit > PURGE_LIMIT:
+            embed = discord.Embed(
+                title="❌ " + self._("Limit too high"),
+                description=self._("You cannot remove more than **{limit}** messages.").format(limit=PURGE_LIMIT),
+                color=self.bot.error_color,
+            )
+            return await ctx.send(embed=embed, delete_after=20.0)
+
+        embed = discord.Embed(
+            title="🗑️ " + self._("Purging messages..."),
+            description=self._("Scanned **{scanned}/{limit}** messages, deleted **{count}**.").format(
+                scanned=0, limit=limit + 1, count=0
+            ),
+            color=self.bot.warn_color,
+        )
+        status = await ctx.send(embed=embed)
+
+        async def progress(result: PurgeResult) -> None:
+            if result.finished:
+                return
+            embed.description = self._("Scanned **{scanned}/{limit}** messages, deleted **{count}**.").format(
+                scanned=result.scanned, limit=limit + 1, count=result.deleted
+            )
+            await status.edit(embed=embed)
+
+        engine = PurgeEngine(ctx.channel, purge_filter.compile(), limit + 1, before=status, progress=progress)
+        result = await engine.run()
+
+        embed = discord.Embed(
+            title="🗑️ " + self._("Messages purged"),
+            description=self._("**{count}** messages have been deleted.").format(count=result.deleted),
+            color=self.bot.error_color,
+        )
+        if result.failed:
+            embed.description += "\n" + self._("**{failed}** messages could not be deleted.").format(
+                failed=result.failed
+            )
+        try:
+            await status.edit(embed=embed, delete_after=20.0)
+        except discord.NotFound:
+            await ctx.send(embed=embed, delete_after=20.0)
+
     @commands.group(
         aliases=["bulkdelete", "bulkdel"],
         help="Deletes multiple messages at once.",
-        description="Deletes up to 100 messages at once. You can optionally specify a user whose messages will be purged.",
+        description=f"Deletes messages from the last specified amount of messages, up to {PURGE_LIMIT}. You can optionally specify a user whose messages will be purged. See the subcommands for other criteria.",
         usage="purge [limit] [user]",
         invoke_without_command=True,
         case_insensitive=True,
@@ -1303,31 +1572,7 @@ class Moderation(commands.Cog):
     @commands.guild_only()
     @mod_command
     async def purge(self, ctx, limit: int, member: discord.Member = None):
-        if limit > 100:
-            embed = discord.Embed(
-                title="❌ " + self._("Limit too high"),
-                description=self._("You cannot remove more than **100** messages."),
-                color=self.bot.error_color,
-            )
-            return await ctx.send(embed=embed, delete_after=20.0)
-        await ctx.channel.trigger_typing()
-
-        if member:
-
-            def check(message):
-                return message.author.id == member.id
-
-            purged = await ctx.channel.purge(limit=limit + 1, check=check)
-
-        else:
-            purged = await ctx.channel.purge(limit=limit + 1)
-
-        embed = discord.Embed(
-            title="🗑️ " + self._("Messages purged"),
-            description=self._("**{count}** messages have been deleted.").format(count=len(purged)),
-            color=self.bot.error_color,
-        )
-        await ctx.send(embed=embed, delete_after=20.0)
+        await self.purge_messages(ctx, limit, PurgeFilter(author_ids={member.id} if member else set()))
 
     @purge.command(
         name="match",
@@ -1341,27 +1586,7 @@ class Moderation(commands.Cog):
     @commands.guild_only()
     @mod_command
     async def purge_match(self, ctx, limit: int, *, text: str):
-        if limit > 100:
-            embed = discord.Embed(
-                title="❌ " + self._("Limit too high"),
-                description=self._("You cannot remove more than **100** messages."),
-                color=self.bot.error_color,
-            )
-            return await ctx.send(embed=embed, delete_after=20.0)
-
-        def check(message):
-            return text in message.content
-
-        await ctx.channel.trigger_typing()
-
-        purged = await ctx.channel.purge(limit=limit + 1, check=check)
-
-        embed = discord.Embed(
-            title="🗑️ " + self._("Messages purged"),
-            description=self._("**{count}** messages have been deleted.").format(count=len(purged)),
-            color=self.bot.error_color,
-        )
-        await ctx.send(embed=embed, delete_after=20.0)
+        await self.purge_messages(ctx, limit, PurgeFilter(contains=text))
 
     @purge.command(
         name="notext",
@@ -1375,27 +1600,7 @@ class Moderation(commands.Cog):
     @commands.guild_only()
     @mod_command
     async def purge_notext(self, ctx, limit: int):
-        if limit > 100:
-            embed = discord.Embed(
-                title="❌ " + self._("Limit too high"),
-                description=self._("You cannot remove more than **100** messages."),
-                color=self.bot.error_color,
-            )
-            return await ctx.send(embed=embed, delete_after=20.0)
-
-        def check(message):
-            return message.content is None
-
-        await ctx.channel.trigger_typing()
-
-        purged = await ctx.channel.purge(limit=limit + 1, check=check)
-
-        embed = discord.Embed(
-            title="🗑️ " + self._("Messages purged"),
-            description=self._("**{count}** messages have been deleted.").format(count=len(purged)),
-            color=self.bot.error_color,
-        )
-        await ctx.send(embed=embed, delete_after=20.0)
+        await self.purge_messages(ctx, limit, PurgeFilter(notext=True))
 
     @purge.command(
         name="startswith",
@@ -1409,27 +1614,7 @@ class Moderation(commands.Cog):
     @commands.guild_only()
     @mod_command
     async def purge_startswith(self, ctx, limit: int, *, text: str):
-        if limit > 100:
-            embed = discord.Embed(
-                title="❌ " + self._("Limit too high"),
-                description=self._("You cannot remove more than **100** messages."),
-                color=self.bot.error_color,
-            )
-            return await ctx.send(embed=embed, delete_after=20.0)
-
-        def check(message):
-            return message.content.startswith(text)
-
-        await ctx.channel.trigger_typing()
-
-        purged = await ctx.channel.purge(limit=limit + 1, check=check)
-
-        embed = discord.Embed(
-            title="🗑️ " + self._("Messages purged"),
-            description=self._("**{count}** messages have been deleted.").format(count=len(purged)),
-            color=self.bot.error_color,
-        )
-        await ctx.send(embed=embed, delete_after=20.0)
+        await self.purge_messages(ctx, limit, PurgeFilter(startswith=text))
 
     @purge.command(
         name="endswith",
@@ -1443,27 +1628,7 @@ class Moderation(commands.Cog):
     @commands.guild_only()
     @mod_command
     async def purge_endswith(self, ctx, limit: int, *, text: str):
-        if limit > 100:
-            embed = discord.Embed(
-                title="❌ " + self._("Limit too high"),
-                description=self._("You cannot remove more than **100** messages."),
-                color=self.bot.error_color,
-            )
-            return await ctx.send(embed=embed, delete_after=20.0)
-
-        def check(message):
-            return message.content.endswith(text)
-
-        await ctx.channel.trigger_typing()
-
-        purged = await ctx.channel.purge(limit=limit + 1, check=check)
-
-        embed = discord.Embed(
-            title="🗑️ " + self._("Messages purged"),
-            description=self._("**{count}** messages have been deleted.").format(count=len(purged)),
-            color=self.bot.error_color,
-        )
-        await ctx.send(embed=embed, delete_after=20.0)
+        await self.purge_messages(ctx, limit, PurgeFilter(endswith=text))
 
     @purge.command(
         name="links",
@@ -1478,29 +1643,7 @@ class Moderation(commands.Cog):
     @commands.guild_only()
     @mod_command
     async def purge_links(self, ctx, limit: int):
-        if limit > 100:
-            embed = discord.Embed(
-                title="❌ " + self._("Limit too high"),
-                description=self._("You cannot remove more than **100** messages."),
-                color=self.bot.error_color,
-            )
-            return await ctx.send(embed=embed, delete_after=20.0)
-
-        def check(message):
-            link_regex = re.compile(r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+")
-            link_matches = link_regex.findall(message.content)
-            return len(link_matches) > 0
-
-        await ctx.channel.trigger_typing()
-
-        purged = await ctx.channel.purge(limit=limit + 1, check=check)
-
-        embed = discord.Embed(
-            title="🗑️ " + self._("Messages purged"),
-            description=self._("**{count}** messages have been deleted.").format(count=len(purged)),
-            color=self.bot.error_color,
-        )
-        await ctx.send(embed=embed, delete_after=20.0)
+        await self.purge_messages(ctx, limit, PurgeFilter(links=True))
 
     @purge.command(
         name="invites",
@@ -1515,29 +1658,7 @@ class Moderation(commands.Cog):
     @commands.guild_only()
     @mod_command
     async def purge_invites(self, ctx, limit: int):
-        if limit > 100:
-            embed = discord.Embed(
-                title="❌ " + self._("Limit too high"),
-                description=self._("You cannot remove more than **100** messages."),
-                color=self.bot.error_color,
-            )
-            return await ctx.send(embed=embed, delete_after=20.0)
-
-        def check(message):
-            invite_regex = re.compile(r"(?:https?://)?discord(?:app)?\.(?:com/invite|gg)/[a-zA-Z0-9]+/?")
-            invite_matches = invite_regex.findall(message.content)
-            return len(invite_matches) > 0
-
-        await ctx.channel.trigger_typing()
-
-        purged = await ctx.channel.purge(limit=limit + 1, check=check)
-
-        embed = discord.Embed(
-            title="🗑️ " + self._("Messages purged"),
-            description=self._("**{count}** messages have been deleted.").format(count=len(purged)),
-            color=self.bot.error_color,
-        )
-        await ctx.send(embed=embed, delete_after=20.0)
+        await self.purge_messages(ctx, limit, PurgeFilter(invites=True))
 
     @purge.command(
         name="images",
@@ -1551,28 +1672,82 @@ class Moderation(commands.Cog):
     @commands.cooldown(1, 5, type=commands.BucketType.guild)
     @commands.guild_only()
     @mod_command
-    async def purge_images(self, ctx, limit: int, *, text: str):
-        if limit > 100:
-            embed = discord.Embed(
-                title="❌ " + self._("Limit too high"),
-                description=self._("You cannot remove more than **100** messages."),
-                color=self.bot.error_color,
-            )
-            return await ctx.send(embed=embed, delete_after=20.0)
+    async def purge_images(self, ctx, limit: int):
+        await self.purge_messages(ctx, limit, PurgeFilter(attachments=True))
 
-        def check(message):
-            return message.attachments and len(message.attachments) > 0
+    @purge.command(
+        name="custom",
+        aliases=["filter"],
+        help="Delete messages matching a combination of criteria. See command help for more.",
+        description="""Deletes messages from the last specified amount of messages that match all of the criteria specified.
+    
+    **Arguments:**
+    `--user` or `-u` - Only match messages by this user (Takes userID, can be repeated)
+    `--regex` - Regex to search message contents for
+    `--contains` - Only match messages containing this text
+    `--startswith` - Only match messages starting with this text
+    `--endswith` - Only match messages ending with this text
+    `--links` - Only match messages containing links
+    `--invites` - Only match messages containing invites
+    `--attachments` - Only match messages with attachments
+    `--notext` - Only match messages without text
+    
+    **Example:**
+    
+    `purge custom 500 --user 123456789 --links`""",
+        usage="purge custom <limit> <args>",
+    )
+    @commands.check(has_mod_perms)
+    @commands.has_permissions(manage_messages=True)
+    @commands.bot_has_permissions(manage_messages=True)
+    @commands.cooldown(1, 5, type=commands.BucketType.guild)
+    @commands.guild_only()
+    @mod_command
+    async def purge_custom(self, ctx, limit: int, *, args):
 
-        await ctx.channel.trigger_typing()
+        parser = ArgParser(add_help=False, allow_abbrev=False)
+        parser.add_argument("--user", "-u", type=int, action="append", default=[])
+        parser.add_argument("--regex")
+        parser.add_argument("--contains")
+        parser.add_argument("--startswith")
+        parser.add_argument("--endswith")
+        parser.add_argument("--links", action="store_true")
+        parser.add_argument("--invites", action="store_true")
+        parser.add_argument("--attachments", action="store_true")
+        parser.add_argument("--notext", action="store_true")
 
-        purged = await ctx.channel.purge(limit=limit + 1, check=check)
+        try:
+            args = parser.parse_args(shlex.split(args))
+        except Exception as error:
+            embed = discord.Embed(
+                title="❌ Argument parsing failed",
+                description=f"Failed parsing arguments: ```{str(error)}```",
+                color=self.bot.error_color,
+            )
+            return await ctx.send(embed=embed)
 
-        embed = discord.Embed(
-            title="🗑️ " + self._("Messages purged"),
-            description=self._("**{count}** messages have been deleted.").format(count=len(purged)),
-            color=self.bot.error_color,
+        purge_filter = PurgeFilter(
+            author_ids=set(args.user),
+            contains=args.contains,
+            startswith=args.startswith,
+            endswith=args.endswith,
+            links=args.links,
+            invites=args.invites,
+            attachments=args.attachments,
+            notext=args.notext,
         )
-        await ctx.send(embed=embed, delete_after=20.0)
+        if args.regex:
+            try:
+                purge_filter.regex = re.compile(args.regex)
+            except re.error as error:
+                embed = discord.Embed(
+                    title="❌ Invalid regex passed",
+                    description=f"Failed parsing regex: ```{str(error)}```",
+                    color=self.bot.error_color,
+                )
+                return await ctx.send(embed=embed)
+
+        await self.purge_messages(ctx, limit, purge_filter)
 
     @commands.command(
         aliases=["clr", "cleanup"],
@@ -1,4 +1,5 @@
 import logging
+from typing import Dict, FrozenSet
 
 import discord
 from discord.ext import commands
@@ -53,6 +54,11 @@ class Permissions(commands.Cog):
             "fun": "Allows usage of commands in the `Fun` category.",
             "events": "Allows creation and management of events. This permission node is not necessary to sign up for them.",
         }
+        # Nodes granted implicitly by holding another node, admin_permitted grants every node
+        self.INHERITED_PERMS = {
+            "mod_permitted": ("automod_excluded", "tags", "giveaway", "fun", "events"),
+        }
+        self.perm_maps: Dict[int, Dict[str, FrozenSet[int]]] = {}  # guild_id -> node -> effective role IDs
 
     async def get_perms(self, guild: discord.Guild, ptype: str) -> list[int]:
         """Get a permission node's roles"""
@@ -68,6 +74,32 @@ class Permissions(commands.Cog):
         else:
             raise ValueError("Invalid permission-node specified.")
 
+    async def get_perm_map(self, guild: discord.Guild) -> Dict[str, FrozenSet[int]]:
+        """
+        Get every node of a guild resolved to the set of role IDs that hold it, including roles that
+        hold it through inheritance. Compiled once per guild and kept until the guild's permissions change.
+        """
+        perm_map = self.perm_maps.get(guild.id)
+        if perm_map is not None:
+            return perm_map
+
+        own = {ptype: set(await self.get_perms(guild, ptype)) for ptype in self.VALID_TYPES}
+        perm_map = {}
+        for ptype, role_ids in own.items():
+            role_ids = role_ids | own["admin_permitted"]
+            for parent, children in self.INHERITED_PERMS.items():
+                if ptype in children:
+                    role_ids |= own[parent]
+            perm_map[ptype] = frozenset(role_ids)
+
+        self.perm_maps[guild.id] = perm_map
+        return perm_map
+
+    def invalidate_perm_map(self, guild_id: int) -> None:
+        """Drop the compiled permissions of a guild, & every check result depending on them."""
+        self.perm_maps.pop(guild_id, None)
+        self.bot.custom_checks.invalidate_guild(guild_id)
+
     async def set_perms(self, guild: discord.Guild, ptype: str, role_ids: list) -> None:
         """Override a list of roles with a new set. Used by the dashboard."""
         if not role_ids:
@@ -89,6 +121,7 @@ class Permissions(commands.Cog):
                 role_ids,
             )
             await self.bot.caching.refresh(table="permissions", guild_id=guild.id)
+            self.invalidate_perm_map(guild.id)
 
         else:
             raise ValueError("Invalid permission type specified.")
@@ -111,6 +144,7 @@ class Permissions(commands.Cog):
                 role_ids,
             )
             await self.bot.caching.refresh(table="permissions", guild_id=guild.id)
+            self.invalidate_perm_map(guild.id)
         else:
             raise ValueError("Role already added to permission node.")
 
@@ -131,9 +165,28 @@ class Permissions(commands.Cog):
                 role_ids,
             )
             await self.bot.caching.refresh(table="permissions", guild_id=guild.id)
+            self.invalidate_perm_map(guild.id)
         else:
             raise ValueError("Role not in permission node.")
 
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.roles != after.roles:
+            self.bot.custom_checks.invalidate_member(after.guild.id, after.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if before.permissions.administrator != after.permissions.administrator:
+            self.bot.custom_checks.invalidate_guild(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.invalidate_perm_map(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.invalidate_perm_map(guild.id)
+
     @commands.group(
         help="View server permissions. See subcommands for modifying them.",
         description="Provides a detailed overview of all server permissions. You can edit them with the subcommands below.",
@@ -1,6 +1,8 @@
+import asyncio
 import datetime
 import json
 import logging
+from typing import Dict, List, Tuple
 
 import discord
 from discord.ext import commands
@@ -10,6 +12,9 @@ from classes.timer import Timer
 
 logger = logging.getLogger(__name__)
 
+# Seconds to wait for other reminders due at the same time in the same channel before delivering
+REMINDER_BATCH_WINDOW = 1.0
+
 
 class ReminderView(discord.ui.View):
     """
@@ -101,6 +106,7 @@ class Reminders(commands.Cog):
     def __init__(self, bot: SnedBot):
         self.bot = bot
         self.timer_cog = self.bot.get_cog("Timers")
+        self.pending_reminders: Dict[Tuple[int, int], List[Timer]] = {}  # (channel_id, expires) -> due reminders
 
     async def remindertime(self, timestr: str):
         """
@@ -333,13 +339,49 @@ __Absolute:__
 
     @commands.Cog.listener()
     async def on_reminder_timer_complete(self, timer: Timer):
+        """
+        Queue the reminder for delivery. Reminders due in the same second for the same channel
+        are collected for a moment, then sent together by deliver_reminders().
+        """
         logger.debug("on_reminder_timer_complete received.")
-        guild = self.bot.get_guild(timer.guild_id)
-        if guild is None:  # Check if bot did not leave guild
+        if self.bot.get_guild(timer.guild_id) is None:  # Check if bot did not leave guild
+            return
+
+        key = (timer.channel_id, timer.expires)
+        if key in self.pending_reminders:
+            self.pending_reminders[key].append(timer)
+            return
+
+        self.pending_reminders[key] = [timer]
+        await asyncio.sleep(REMINDER_BATCH_WINDOW)
+        await self.deliver_reminders(self.pending_reminders.pop(key))
+
+    async def resolve_channel(self, guild: discord.Guild, channel_id: int):
+        """Get a channel or thread from cache, only falling back to the API if it is not cached."""
+
+        channel = guild.get_channel(channel_id) or guild.get_thread(channel_id)
+        if channel:
+            return channel
+        try:
+            return await self.bot.fetch_channel(channel_id)
+        except (discord.Forbidden, discord.HTTPException, discord.NotFound):
+            return None
+
+    async def deliver_reminders(self, timers: List[Timer]):
+        """
+        Deliver a batch of reminders due in the same channel, packing as many as Discord allows into a single message.
+        Falls back to DMs if the channel cannot be reached.
+        """
+
+        guild = self.bot.get_guild(timers[0].guild_id)
+        if guild is None:
             return
-        channel = await self.bot.fetch_channel(timer.channel_id)
-        if guild.get_member(timer.user_id) != None:  # Check if user did not leave guild
+
+        reminders = []  # (user, embed, pings) for every reminder whose author is still in the guild
+        for timer in timers:
             user = guild.get_member(timer.user_id)
+            if user is None:  # Check if user did not leave guild
+                continue
             notes = json.loads(timer.notes)
             embed = discord.Embed(
                 title=f"✉️ {user.display_name}, your reminder:",
@@ -347,21 +389,55 @@ __Absolute:__
                 color=self.bot.embed_blue,
             )
             pings = [user.mention]
-            if len(notes["additional_recipients"]) > 0:
-                for user_id in notes["additional_recipients"]:
-                    if guild.get_member(user_id):
-                        pings.append(guild.get_member(user_id).mention)
+            for user_id in notes["additional_recipients"]:
+                member = guild.get_member(user_id)
+                if member:
+                    pings.append(member.mention)
+            reminders.append((user, embed, pings))
+
+        if not reminders:
+            return
+
+        channel = await self.resolve_channel(guild, timers[0].channel_id)
+
+        # Discord caps a message at 10 embeds, 6000 characters of embeds and 2000 characters of content
+        batches = [[]]
+        embed_len = content_len = 0
+        for reminder in reminders:
+            user, embed, pings = reminder
+            ping_len = len(" ".join(pings)) + 1
+            if batches[-1] and (
+                len(batches[-1]) >= 10 or embed_len + len(embed) > 6000 or content_len + ping_len > 2000
+            ):
+                batches.append([])
+                embed_len = content_len = 0
+            batches[-1].append(reminder)
+            embed_len += len(embed)
+            content_len += ping_len
+
+        for batch in batches:
+            if channel is None:
+                await self.dm_reminders(batch)
+                continue
             try:
-                await channel.send(embed=embed, content=" ".join(pings))
+                await channel.send(
+                    embeds=[embed for _, embed, _ in batch],
+                    content=" ".join(" ".join(pings) for _, _, pings in batch),
+                )
             except (discord.Forbidden, discord.HTTPException, discord.NotFound):
-                try:  # Fallback to DM if cannot send in channel
-                    await user.send(
-                        embed=embed,
-                        content="I lost access to the channel this reminder was sent from, so here it is!",
-                    )
-                except discord.Forbidden:
-                    logger.info(f"Failed to deliver a reminder to user {user}.")
-                    return
+                await self.dm_reminders(batch)
+
+    async def dm_reminders(self, batch: list):
+        """Fallback to DM if cannot send in channel"""
+
+        for user, embed, _ in batch:
+            try:
+                await user.send(
+                    embed=embed,
+                    content="I lost access to the channel this reminder was sent from, so here it is!",
+                )
+            except (discord.Forbidden, discord.HTTPException):
+                logger.info(f"Failed to deliver a reminder to user {user}.")
 
 
 def setup(bot: SnedBot):
@@ -1,10 +1,14 @@
 import asyncio
+import collections
 import logging
+import re
+import time
+from dataclasses import dataclass, field
 
 import discord
 from discord.ext import commands, pages
 from classes.bot import SnedBot
-from typing import List
+from typing import Dict, List, Set, Tuple
 
 from classes import components
 
@@ -19,62 +23,217 @@ async def has_priviliged(ctx):
 
 logger = logging.getLogger(__name__)
 
+ROLE_BUTTON_ID = re.compile(r"(\d+):(\d+)")  # custom_id of role-buttons, entry_id:role_id
+
 
 class PersistentRoleView(discord.ui.View):
+    """
+    The buttons of a role-button message. Clicks are not handled by the view but by RoleButtons.on_interaction,
+    which reads the entry & role from the button's custom_id, so no views have to be registered on startup.
+    """
+
     def __init__(self, buttons: List[discord.ui.Button] = None):
         super().__init__(timeout=None)
         if buttons:
             for button in buttons:
                 self.add_item(button)
 
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return False  # Views attached by this process are still stored by the library, keep them from responding
+
+
+@dataclass
+class PendingRoleEdit:
+    """Role changes requested by a single member, merged into one member edit."""
+
+    add: Set[int] = field(default_factory=set)
+    remove: Set[int] = field(default_factory=set)
+    entry_ids: Set[int] = field(default_factory=set)
+    interactions: List[discord.Interaction] = field(default_factory=list)  # To report failures to
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class RoleEditQueue:
+    """
+    Applies role-button clicks in the background, one guild at a time, as member edits share a per-guild rate limit.
+    Clicks of a member arriving while their edit is still queued are merged into it, so rapid toggling
+    results in at most one request per member, or none if the clicks cancel out.
+    """
+
+    def __init__(self):
+        self.guilds: Dict[int, "collections.OrderedDict[int, PendingRoleEdit]"] = {}  # guild_id -> member_id -> edit
+        self.workers: Dict[int, asyncio.Task] = {}
+        self.applying: Dict[int, Tuple[int, PendingRoleEdit]] = {}  # guild_id -> (member_id, edit) in flight
+        # (guild_id, member_id) -> role IDs after our last edit, until the member cache catches up with it,
+        # as editing from stale roles would revert the previous edit
+        self.confirmed: Dict[Tuple[int, int], Set[int]] = {}
+        self.unsynced: Set[Tuple[int, int]] = set()  # Members with an edit in flight that the cache has not seen
+        self.stats = {"clicks": 0, "edits": 0, "merged": 0, "noop": 0, "failed": 0}
+        self.latencies = collections.deque(maxlen=100)  # Seconds from a click to its edit being applied
+
+    def has_role(self, member: discord.Member, role_id: int) -> bool:
+        """If the member will have the role once their queued edit is applied."""
+
+        applying = self.applying.get(member.guild.id)
+        for edit in (
+            self.guilds.get(member.guild.id, {}).get(member.id),
+            applying[1] if applying and applying[0] == member.id else None,
+        ):
+            if edit and role_id in edit.add:
+                return True
+            if edit and role_id in edit.remove:
+                return False
+        return role_id in self._current_roles(member)
+
+    def _current_roles(self, member: discord.Member) -> Set[int]:
+        confirmed = self.confirmed.get((member.guild.id, member.id))
+        if confirmed is not None:
+            return set(confirmed)
+        return {role.id for role in member.roles if not role.is_default()}
+
+    def member_updated(self, member: discord.Member) -> None:
+        """The member's roles in cache changed, so they are newer than anything our edits returned."""
+
+        key = (member.guild.id, member.id)
+        self.confirmed.pop(key, None)
+        self.unsynced.discard(key)
+
+    def toggle(self, interaction: discord.Interaction, role_id: int, entry_id: int) -> bool:
+        """Queue toggling a role for the member who clicked. Returns True if the role will be added."""
+
+        member = interaction.user
+        pending = self.guilds.setdefault(member.guild.id, collections.OrderedDict())
+        edit = pending.get(member.id)
+        if edit is None:
+            edit = pending[member.id] = PendingRoleEdit()
+        else:
+            self.stats["merged"] += 1
+        self.stats["clicks"] += 1
+
+        add = not self.has_role(member, role_id)
+        if add:
+            edit.remove.discard(role_id)
+            edit.add.add(role_id)
+        else:
+            edit.add.discard(role_id)
+            edit.remove.add(role_id)
+        edit.entry_ids.add(entry_id)
+        edit.interactions.append(interaction)
+
+        worker = self.workers.get(member.guild.id)
+        if worker is None or worker.done():
+            self.workers[member.guild.id] = asyncio.create_task(self._work(member.guild))
+        return add
+
+    async def _work(self, guild: discord.Guild) -> None:
+        pending = self.guilds.get(guild.id)
+        try:
+            while pending:
+                member_id, edit = pending.popitem(last=False)
+                self.applying[guild.id] = (member_id, edit)
+                try:
+                    await self._apply(guild, member_id, edit)
+                except Exception as error:  # Keep going, the rest of the queue would otherwise wait for a click
+                    self.stats["failed"] += 1
+                    logger.error(
+                        f"Failed applying role-button edit for member {member_id} in guild {guild.id}: {error}"
+                    )
+        finally:
+            self.applying.pop(guild.id, None)
+            if self.guilds.get(guild.id) is pending and not pending:
+                self.guilds.pop(guild.id)
+            self.workers.pop(guild.id, None)
+
+    async def _apply(self, guild: discord.Guild, member_id: int, edit: PendingRoleEdit) -> None:
+        member = guild.get_member(member_id)
+        if member is None:
+            return
+
+        # Resolve against the member's roles as they are now, not as they were when clicking
+        key = (guild.id, member_id)
+        current = self._current_roles(member)
+        add, remove = edit.add - current, edit.remove & current
+        if not add and not remove:
+            self.stats["noop"] += 1
+            return
+
+        ids = ", ".join(str(entry_id) for entry_id in sorted(edit.entry_ids))
+        reason = f"Updated by role-button (ID: {ids})"
+        self.unsynced.add(key)
+        try:
+            # A single role is changed on its own, so roles changed by others meanwhile are left alone
+            if len(add) + len(remove) == 1:
+                if add:
+                    await member.add_roles(discord.Object(id=next(iter(add))), reason=reason)
+                else:
+                    await member.remove_roles(discord.Object(id=next(iter(remove))), reason=reason)
+                roles = (current | add) - remove
+            else:  # Merged toggles are applied at once, replacing the member's roles
+                updated = await member.edit(
+                    roles=[discord.Object(id=role_id) for role_id in (current | add) - remove], reason=reason
+                )
+                roles = (
+                    {role.id for role in updated.roles if not role.is_default()}
+                    if updated
+                    else (current | add) - remove
+                )
+        except discord.HTTPException as error:
+            self.unsynced.discard(key)
+            self.stats["failed"] += 1
+            logger.info(f"Failed applying role-button edit for member {member_id} in guild {guild.id}: {error}")
+            embed = discord.Embed(
+                title="❌ Insufficient permissions",
+                description="Failed adding role due to an issue with permissions and/or role hierarchy! Please contact an administrator!",
+                color=0xFF0000,
+            )
+            try:
+                await edit.interactions[-1].followup.send(embed=embed, ephemeral=True)
+            except discord.HTTPException:
+                pass
+        else:
+            self.stats["edits"] += 1
+            self.latencies.append(time.monotonic() - edit.enqueued_at)
+            if key in self.unsynced:  # Otherwise the member cache already caught up during the request
+                self.unsynced.discard(key)
+                self.confirmed[key] = roles
+
+    def cancel(self) -> None:
+        """Stop all workers, queued edits are dropped."""
+
+        for worker in self.workers.values():
+            worker.cancel()
+        self.workers.clear()
+        self.guilds.clear()
+
+    def get_stats(self) -> dict:
+        """Return queue depths, counters & click-to-edit latencies."""
+
+        depths = {guild_id: len(pending) for guild_id, pending in self.guilds.items()}
+        latencies = sorted(self.latencies)
+        return {
+            "queued": sum(depths.values()),
+            "queues": depths,
+            "max_depth": max(depths.values(), default=0),
+            "latency_avg": sum(latencies) / len(latencies) if latencies else 0.0,
+            "latency_p95": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+            **self.stats,
+        }
+
 
 class ButtonRoleButton(discord.ui.Button):
+    """A role-button, its custom_id carries the entry & role ID for RoleButtons.on_interaction."""
+
     def __init__(
         self,
         entry_id: int,
-        role: discord.Role,
+        role_id: int,
         emoji: discord.PartialEmoji,
         style: discord.ButtonStyle,
         label: str = None,
     ):
-        super().__init__(style=style, label=label, emoji=emoji, custom_id=f"{entry_id}:{role.id}")
+        super().__init__(style=style, label=label, emoji=emoji, custom_id=f"{entry_id}:{role_id}")
         self.entry_id = entry_id
-        self.role = role
-
-    # Called whenever the button is called
-    async def callback(self, interaction: discord.Interaction):
-        if interaction.guild_id:
-            try:
-                if self.role in interaction.user.roles:
-                    await interaction.user.remove_roles(
-                        self.role,
-                        reason=f"Removed by role-button (ID: {self.entry_id})",
-                    )
-                    embed = discord.Embed(
-                        title="✅ Role removed",
-                        description=f"Removed role: {self.role.mention}",
-                        color=0x77B255,
-                    )
-                    await interaction.response.send_message(embed=embed, ephemeral=True)
-                else:
-                    await interaction.user.add_roles(
-                        self.role,
-                        reason=f"Granted by role-button (ID: {self.entry_id})",
-                    )
-                    embed = discord.Embed(
-                        title="✅ Role added",
-                        description=f"Added role: {self.role.mention}",
-                        color=0x77B255,
-                    )
-                    embed.set_footer(text="If you would like it removed, click the button again!")
-                    await interaction.response.send_message(embed=embed, ephemeral=True)
-            except discord.Forbidden:
-                embed = discord.Embed(
-                    title="❌ Insufficient permissions",
-                    description="Failed adding role due to an issue with permissions and/or role hierarchy! Please contact an administrator!",
-                    color=0xFF0000,
-                )
-                await interaction.response.send_message(embed=embed, ephemeral=True)
+        self.role_id = role_id
 
 
 class RoleButtons(commands.Cog, name="Role-Buttons"):
@@ -91,54 +250,70 @@ class RoleButtons(commands.Cog, name="Role-Buttons"):
             "Green": discord.ButtonStyle.success,
             "Red": discord.ButtonStyle.danger,
         }
+        self.role_edits = RoleEditQueue()
+
+    def cog_unload(self):
+        self.role_edits.cancel()
 
     async def cog_check(self, ctx):
         return await ctx.bot.custom_checks.has_permissions(ctx, "role_buttons")
 
     @commands.Cog.listener()
-    async def on_ready(self):
-        # READY clears state, including persistent views
-        # Thus views must be re-added
-        await self.buttonroles_init()
-
-    async def buttonroles_init(self):
-        """Re-acquire all persistent buttons"""
-        await self.bot.wait_until_ready()
-        logger.info("Adding persistent views to button roles...")
-        records = await self.bot.pool.fetch(
-            """
-        SELECT 
-        guild_id, 
-        entry_id, 
-        msg_id, 
-        role_id, 
-        emoji, 
-        buttonlabel, 
-        buttonstyle 
-        FROM button_roles"""
-        )
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.roles != after.roles:
+            self.role_edits.member_updated(after)
 
-        add_to_persistent_views = {}
-
-        for record in records:
-            guild = self.bot.get_guild(record.get("guild_id"))
-            emoji = discord.PartialEmoji.from_str(record.get("emoji"))
-            button = ButtonRoleButton(
-                record.get("entry_id"),
-                guild.get_role(record.get("role_id")),
-                label=record.get("buttonlabel"),
-                style=self.button_styles[record.get("buttonstyle")],
-                emoji=emoji,
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        self.role_edits.member_updated(member)
+
+    # Clicks of every role-button end up here, instead of a persistent view being registered for each message
+    @commands.Cog.listener()
+    async def on_interaction(self, interaction: discord.Interaction):
+        if interaction.type != discord.InteractionType.component or not interaction.guild_id:
+            return
+        match = ROLE_BUTTON_ID.fullmatch((interaction.data or {}).get("custom_id", ""))
+        if not match:
+            return
+
+        entry_id, role_id = int(match.group(1)), int(match.group(2))
+        records = await self.bot.caching.get(table="button_roles", guild_id=interaction.guild_id, entry_id=entry_id)
+        if not records or records[0]["role_id"] != role_id or records[0]["msg_id"] != interaction.message.id:
+            return  # Not a role-button, e.g. an event sign-up button with a numeric category
+
+        # Resolved on every click, so renamed or recreated roles are always current
+        role = interaction.guild.get_role(role_id)
+        if role is None:
+            embed = discord.Embed(
+                title="❌ Role not found",
+                description="The role of this button no longer exists! Please contact an administrator!",
+                color=0xFF0000,
             )
-            if record.get("msg_id") not in add_to_persistent_views.keys():
-                add_to_persistent_views[record.get("msg_id")] = [button]
-            else:
-                add_to_persistent_views[record.get("msg_id")].append(button)
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
 
-        for msg_id, buttons in add_to_persistent_views.items():
-            self.bot.add_view(PersistentRoleView(buttons), message_id=msg_id)
+        if role.managed or role >= interaction.guild.me.top_role:
+            embed = discord.Embed(
+                title="❌ Insufficient permissions",
+                description="Failed adding role due to an issue with permissions and/or role hierarchy! Please contact an administrator!",
+                color=0xFF0000,
+            )
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
 
-        logger.info("Button roles ready!")
+        # Respond right away, the role edit itself is applied in the background
+        if self.role_edits.toggle(interaction, role.id, entry_id):
+            embed = discord.Embed(
+                title="✅ Role added",
+                description=f"Added role: {role.mention}",
+                color=0x77B255,
+            )
+            embed.set_footer(text="If you would like it removed, click the button again!")
+        else:
+            embed = discord.Embed(
+                title="✅ Role removed",
+                description=f"Removed role: {role.mention}",
+                color=0x77B255,
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
     @commands.group(
         aliases=["rr", "rb", "reactionrole", "rolebuttons"],
@@ -215,7 +390,7 @@ class RoleButtons(commands.Cog, name="Role-Buttons"):
                         buttons.append(
                             ButtonRoleButton(
                                 record.get("entry_id"),
-                                ctx.guild.get_role(record.get("role_id")),
+                                record.get("role_id"),
                                 label=record.get("buttonlabel"),
                                 style=self.button_styles[record.get("buttonstyle")],
                                 emoji=emoji,
@@ -521,7 +696,7 @@ class RoleButtons(commands.Cog, name="Role-Buttons"):
 
         button = ButtonRoleButton(
             entry_id=entry_id,
-            role=reactionrole,
+            role_id=reactionrole.id,
             label=label,
             emoji=reactemoji,
             style=self.button_styles[buttonstyle],
@@ -553,7 +728,7 @@ class RoleButtons(commands.Cog, name="Role-Buttons"):
                                 buttons.append(
                                     ButtonRoleButton(
                                         record.get("entry_id"),
-                                        ctx.guild.get_role(record.get("role_id")),
+                                        record.get("role_id"),
                                         label=record.get("buttonlabel"),
                                         style=self.button_styles[record.get("buttonstyle")],
                                         emoji=emoji,
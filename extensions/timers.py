@@ -1,22 +1,82 @@
 import asyncio
+import bisect
 import datetime
+import heapq
 import logging
-import re
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
 
 import discord
-import Levenshtein as lev
 from discord.ext import commands, tasks
 
 from classes.bot import SnedBot
 from classes.timer import Timer
+from extensions.utils import time_parser
 
 logger = logging.getLogger(__name__)
 
+# Upper bounds (in seconds) of the dispatch lag histogram buckets, the last bucket catches everything else
+LAG_BUCKETS = (1, 5, 30, 60, 300, 3600)
+
 
 async def has_owner(ctx):
     return await ctx.bot.custom_checks.has_owner(ctx)
 
 
+@dataclass
+class DispatchMetrics:
+    """
+    In-memory statistics about timer dispatching since the cog was loaded.
+    """
+
+    lag_buckets: tuple = field(default=LAG_BUCKETS, init=False)  # The histogram is sized after LAG_BUCKETS
+    lag_histogram: list = field(default_factory=lambda: [0] * (len(LAG_BUCKETS) + 1))
+    lag_total: float = 0.0
+    lag_max: float = 0.0
+    dispatched: int = 0
+    restarts: int = 0
+    reshuffles: int = 0
+    # listener name -> [call count, total seconds, max seconds, failures]
+    listeners: dict = field(default_factory=dict)
+
+    def record_lag(self, lag: float) -> None:
+        lag = max(lag, 0.0)
+        self.lag_histogram[bisect.bisect_right(self.lag_buckets, lag)] += 1
+        self.lag_total += lag
+        self.lag_max = max(self.lag_max, lag)
+        self.dispatched += 1
+
+    def record_listener(self, name: str, elapsed: float, failed: bool = False) -> None:
+        stats = self.listeners.setdefault(name, [0, 0.0, 0.0, 0])
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] = max(stats[2], elapsed)
+        stats[3] += int(failed)
+
+
+@dataclass
+class RecurringJob:
+    """
+    Represents a periodic, in-memory job scheduled by the Timers cog.
+    These are not persisted, cogs owning jobs register them in a register_recurring_jobs(timers) method,
+    which is called again whenever the Timers cog is reloaded.
+    """
+
+    name: str
+    callback: Callable[[], Awaitable]
+    interval: float
+    jitter: float = 0.0
+    missed_policy: str = "run_once"  # What to do if a whole interval was missed: "run_once" or "skip"
+    due: float = 0.0  # The slot this job is scheduled for, without jitter
+    next_run: float = 0.0  # The slot this job is scheduled for, with jitter
+    running: bool = False
+    runs: int = 0
+    missed: int = 0
+
+
 class Timers(commands.Cog):
     """
     All timer-related functionality, including time conversion from strings,
@@ -29,114 +89,35 @@ class Timers(commands.Cog):
         self.bot = bot
         self.current_timer = None
         self.currenttask = None
+        self.metrics = DispatchMetrics()
+        self.recurring_jobs = {}
+        self.recurring_heap = []  # (next_run, name) pairs, stale entries are skipped lazily
+        self.recurring_task = None
         self._ = self.bot.get_localization("timers", self.bot.lang)
         self.wait_for_active_timers.start()  # pylint: disable=<no-member>
 
+        # Core periodic work that does not belong to any cog
+        self.add_recurring_job("cleanup_userdata", self.bot.global_config.cleanup_userdata, 3600.0, jitter=300.0)
+        self.add_recurring_job("backup_bot_db", self.bot.backup_bot_db, 86400.0, missed_policy="skip")
+        # Jobs of cogs loaded before this one were dropped with the previous instance of the cog
+        for cog in self.bot.cogs.values():
+            if hasattr(cog, "register_recurring_jobs"):
+                cog.register_recurring_jobs(self)
+
     def cog_unload(self):
-        self.currenttask.cancel()
+        if self.currenttask:
+            self.currenttask.cancel()
+        if self.recurring_task:
+            self.recurring_task.cancel()
         self.wait_for_active_timers.cancel()  # pylint: disable=<no-member>
 
     async def converttime(self, timestr: str, force_mode: str = None):
         """
         Tries converting a string to datetime.datetime via regex, returns datetime.datetime and strings it extracted from if successful, otherwise raises ValueError
         Result of 12 hours of pain #remember
+        Parsing is done by extensions.utils.time_parser, which caches repeated expressions.
         """
-
-        logger.debug(f"String passed for time conversion: {timestr}")
-
-        date_and_time_regex = re.compile(r"\d{4}-[0-1]\d-[0-3]\d [0-2]\d:[0-5]\d")
-        date_regex = re.compile(r"\d{4}-[0-1]\d-[0-3]\d")
-        date_and_time_match = date_and_time_regex.search(timestr)
-        date_match = date_regex.search(timestr)
-        if not force_mode or force_mode == "absolute":
-
-            if date_and_time_match:
-
-                time = datetime.datetime.strptime(date_and_time_match.group(), "%Y-%m-%d %H:%M")
-                time = time.replace(tzinfo=datetime.timezone.utc)
-
-                if time > datetime.datetime.now(datetime.timezone.utc):
-
-                    return time, [date_and_time_match.group()]
-
-                else:
-                    raise ValueError("Date is not in the future.")
-
-            elif date_match:
-
-                time = datetime.datetime.strptime(date_match.group(), "%Y-%m-%d")
-                time = time.replace(tzinfo=datetime.timezone.utc)
-
-                if time > datetime.datetime.now(datetime.timezone.utc):
-
-                    return time, [date_match.group()]
-
-                else:
-                    raise ValueError("Date is not in the future.")
-
-        if not force_mode or force_mode == "relative":
-            # Relative time conversion
-            # Get any pair of <number><word> with a single optional space in between, and return them as a dict (sort of)
-            time_regex = re.compile(r"(\d+(?:[.,]\d+)?)\s{0,1}([a-zA-Z]+)")
-            time_letter_dict = {
-                "h": 3600,
-                "s": 1,
-                "m": 60,
-                "d": 86400,
-                "w": 86400 * 7,
-                "M": 86400 * 30,
-                "Y": 86400 * 365,
-                "y": 86400 * 365,
-            }
-            time_word_dict = {
-                "hour": 3600,
-                "second": 1,
-                "minute": 60,
-                "day": 86400,
-                "week": 86400 * 7,
-                "month": 86400 * 30,
-                "year": 86400 * 365,
-                "sec": 1,
-                "min": 60,
-            }
-            matches = time_regex.findall(timestr)
-            time = 0
-            strings = []  # Stores all identified times
-
-            for val, category in matches:
-                val = val.replace(",", ".")  # Replace commas with periods to correctly register decimal places
-                # If this is a single letter
-
-                if len(category) == 1:
-
-                    if category in time_letter_dict.keys():
-
-                        strings.append(val + category)
-                        strings.append(val + " " + category)  # Append both with space & without
-                        time += time_letter_dict[category] * float(val)
-
-                else:
-                    # If a partial match is found with any of the keys
-                    # Reason for making the same code here is because words are case-insensitive, as opposed to single letters
-
-                    for string in time_word_dict.keys():
-
-                        if (
-                            lev.distance(category.lower(), string.lower()) <= 1
-                        ):  # If str has 1 or less different letters (For plural)
-
-                            time += time_word_dict[string] * float(val)
-                            strings.append(val + category)
-                            strings.append(val + " " + category)
-                            break
-
-            if time > 0:
-
-                time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=time)
-            else:  # If time is 0, then we failed to parse or the user indeed provided 0, which makes no sense, so we raise an error.
-                raise ValueError("Failed converting time from string. (Relative conversion)")
-
-            return time, strings
+        return time_parser.parse_time(timestr, force_mode)
 
     async def get_latest_timer(self, days=7):
         """
@@ -160,6 +141,7 @@ class Timers(commands.Cog):
                 event=result[0].get("event"),
                 expires=result[0].get("expires"),
                 notes=result[0].get("notes"),
+                recurring_in=result[0].get("recurring_in"),
             )
 
             logger.debug(f"Timer class created for latest: {timer}")
@@ -168,10 +150,19 @@ class Timers(commands.Cog):
     async def call_timer(self, timer: Timer):
         """
         Calls and dispatches a timer object. Updates the database.
+        Recurring timers are moved to their next slot in the future instead of being deleted,
+        runs missed while the bot was offline are coalesced into this one.
         """
 
-        logger.debug("Deleting timer entry {timerid}".format(timerid=timer.id))
-        await self.bot.pool.execute("""DELETE FROM timers WHERE id = $1""", timer.id)
+        if timer.recurring_in:
+            now = round(time.time())
+            missed = max(math.ceil((now - timer.expires) / timer.recurring_in), 1)
+            next_expiry = timer.expires + missed * timer.recurring_in
+            logger.debug(f"Rescheduling recurring timer entry {timer.id} to {next_expiry}")
+            await self.bot.pool.execute("""UPDATE timers SET expires = $1 WHERE id = $2""", next_expiry, timer.id)
+        else:
+            logger.debug("Deleting timer entry {timerid}".format(timerid=timer.id))
+            await self.bot.pool.execute("""DELETE FROM timers WHERE id = $1""", timer.id)
 
         self.current_timer = None
         logger.debug("Deleted")
@@ -180,11 +171,193 @@ class Timers(commands.Cog):
         Dispatch an event named eventname_timer_complete, which will cause all listeners 
         for this event to fire. This function is not documented, so if anything breaks, it
         is probably in here. It passes on the Timer
+        Listeners are scheduled individually instead of through bot.dispatch so their execution time can be measured.
         """
 
-        self.bot.dispatch(f"{timer.event}_timer_complete", timer)
+        self.metrics.record_lag(time.time() - timer.expires)
+
+        event_name = f"on_{timer.event}_timer_complete"
+        for listener in self.bot.extra_events.get(event_name, []):
+            self.bot.loop.create_task(self.run_timed_listener(listener, event_name, timer))
         logger.debug(f"Dispatched: {timer.event}_timer_complete")
 
+    async def run_timed_listener(self, listener, event_name: str, timer: Timer):
+        """Run a single timer listener, record how long it took, and report errors like a regular event would."""
+
+        start = time.perf_counter()
+        failed = False
+        try:
+            await listener(timer)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            failed = True
+            try:
+                await self.bot.on_error(event_name, timer)
+            except asyncio.CancelledError:
+                pass
+        finally:
+            self.metrics.record_listener(listener.__qualname__, time.perf_counter() - start, failed)
+
+    def restart_dispatcher(self, reshuffle: bool = True):
+        """Cancel the running dispatch_timers() task, if any, and start a new one to re-check for the latest timer."""
+
+        if reshuffle:
+            self.metrics.reshuffles += 1
+        else:
+            self.metrics.restarts += 1
+
+        if self.currenttask:
+            self.currenttask.cancel()
+        self.currenttask = self.bot.loop.create_task(self.dispatch_timers())
+
+    async def get_metrics(self) -> dict:
+        """
+        Returns a dict describing the state of the scheduler: pending timers by event type,
+        the next expiry, dispatch lag histogram, listener execution times and restart counts.
+        """
+
+        records = await self.bot.pool.fetch(
+            """SELECT event, COUNT(*) AS count, MIN(expires) AS next_expiry FROM timers GROUP BY event"""
+        )
+        pending = {record.get("event"): record.get("count") for record in records}
+        next_expiry = min([record.get("next_expiry") for record in records], default=None)
+
+        labels = [f"<{bound}s" for bound in self.metrics.lag_buckets] + [f">={self.metrics.lag_buckets[-1]}s"]
+        dispatched = self.metrics.dispatched
+
+        return {
+            "pending": pending,
+            "pending_total": sum(pending.values()),
+            "next_expiry": next_expiry,
+            "current_timer_id": self.current_timer.id if self.current_timer else None,
+            "dispatched": dispatched,
+            "lag_histogram": dict(zip(labels, self.metrics.lag_histogram)),
+            "lag_avg": self.metrics.lag_total / dispatched if dispatched else 0.0,
+            "lag_max": self.metrics.lag_max,
+            "listeners": {
+                name: {
+                    "calls": calls,
+                    "avg": total / calls if calls else 0.0,
+                    "max": max_elapsed,
+                    "failures": failures,
+                }
+                for name, (calls, total, max_elapsed, failures) in self.metrics.listeners.items()
+            },
+            "restarts": self.metrics.restarts,
+            "reshuffles": self.metrics.reshuffles,
+            "recurring": {
+                name: {
+                    "interval": job.interval,
+                    "next_run": round(job.next_run),
+                    "runs": job.runs,
+                    "missed": job.missed,
+                }
+                for name, job in self.recurring_jobs.items()
+            },
+        }
+
+    def add_recurring_job(
+        self,
+        name: str,
+        callback: Callable[[], Awaitable],
+        interval: float,
+        *,
+        jitter: float = 0.0,
+        missed_policy: str = "run_once",
+        first_run: float = 0.0,
+    ) -> RecurringJob:
+        """
+        Register a coroutine function to be called every interval seconds, replacing any job with the same name.
+        A random delay of up to jitter seconds is added to every run to spread out load.
+        If a whole interval is missed (e.g. the previous run is still going), missed_policy decides
+        if the job runs once to catch up ("run_once") or waits for its next slot ("skip").
+        first_run is the delay in seconds before the first run, by default the job runs as soon as possible.
+        """
+
+        if missed_policy not in ["run_once", "skip"]:
+            raise ValueError("Invalid missed_policy passed.")
+
+        due = time.time() + first_run
+        job = RecurringJob(
+            name=name,
+            callback=callback,
+            interval=interval,
+            jitter=jitter,
+            missed_policy=missed_policy,
+            due=due,
+            next_run=due,
+        )
+        self.recurring_jobs[name] = job
+        self._push_recurring(job)
+        return job
+
+    def remove_recurring_job(self, name: str) -> None:
+        """Stop scheduling a recurring job. Does nothing if there is no such job."""
+        self.recurring_jobs.pop(name, None)
+
+    def _push_recurring(self, job: RecurringJob) -> None:
+        """Push a job onto the heap, and wake the recurring dispatcher if it is now the earliest job."""
+        heapq.heappush(self.recurring_heap, (job.next_run, job.name))
+        if self.recurring_task is None or self.recurring_task.done():
+            self.recurring_task = self.bot.loop.create_task(self.dispatch_recurring())
+        elif self.recurring_heap[0][1] == job.name and asyncio.current_task() is not self.recurring_task:
+            self.recurring_task.cancel()
+            self.recurring_task = self.bot.loop.create_task(self.dispatch_recurring())
+
+    def _reschedule_recurring(self, job: RecurringJob) -> None:
+        """Move a job to its next slot, applying jitter."""
+        now = time.time()
+        job.due += job.interval
+        if job.due <= now:  # Fell behind, skip ahead to the next slot in the future
+            job.due += math.ceil((now - job.due) / job.interval) * job.interval
+        job.next_run = job.due + random.uniform(0, job.jitter)
+        self._push_recurring(job)
+
+    async def run_recurring_job(self, job: RecurringJob):
+        """Execute a recurring job, reporting errors like a regular event would."""
+        job.running = True
+        try:
+            await job.callback()
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            await self.bot.on_error(f"recurring job {job.name}")
+        finally:
+            job.running = False
+            job.runs += 1
+
+    async def dispatch_recurring(self):
+        """
+        A coroutine to dispatch recurring jobs from the heap.
+        """
+        await self.bot.wait_until_ready()
+
+        while self.recurring_heap and not self.bot.is_closed():
+            next_run, name = self.recurring_heap[0]
+            job = self.recurring_jobs.get(name)
+
+            if job is None or job.next_run != next_run:  # Removed or rescheduled since pushed
+                heapq.heappop(self.recurring_heap)
+                continue
+
+            now = time.time()
+            if next_run > now:
+                await asyncio.sleep(next_run - now)
+                continue
+
+            heapq.heappop(self.recurring_heap)
+
+            missed_slot = now - job.due >= job.interval
+            if job.running or (missed_slot and job.missed_policy == "skip"):
+                job.missed += 1
+                logger.info(f"Skipping missed run of recurring job '{name}'.")
+            else:
+                logger.debug(f"Dispatching recurring job: {name}")
+                self.bot.loop.create_task(self.run_recurring_job(job))
+
+            self._reschedule_recurring(job)
+
     async def dispatch_timers(self):
         """
         A coroutine to dispatch timers.
@@ -217,8 +390,8 @@ class Timers(commands.Cog):
         except asyncio.CancelledError:
             raise
         except (OSError, discord.ConnectionClosed):
-            self.currenttask.cancel()
-            self.currenttask = self.bot.loop.create_task(self.dispatch_timers())
+            logger.warning("Timer dispatcher lost connection, restarting...")
+            self.restart_dispatcher(reshuffle=False)
 
     async def update_timer(
         self,
@@ -247,8 +420,7 @@ class Timers(commands.Cog):
             )
         if self.current_timer and self.current_timer.id == entry_id:
             logger.debug("Updating timers resulted in reshuffling.")
-            self.currenttask.cancel()
-            self.currenttask = self.bot.loop.create_task(self.dispatch_timers())
+            self.restart_dispatcher()
 
     async def get_timer(self, entry_id: int, guild_id: int) -> Timer:
         """Retrieve a pending timer"""
@@ -262,13 +434,14 @@ class Timers(commands.Cog):
         if records and len(records) > 0:
             record = records[0]
             timer = Timer(
-                record.get("id"),
-                record.get("guild_id"),
-                record.get("user_id"),
-                record.get("event"),
-                record.get("channel_id"),
-                record.get("expires"),
-                record.get("notes"),
+                id=record.get("id"),
+                guild_id=record.get("guild_id"),
+                user_id=record.get("user_id"),
+                channel_id=record.get("channel_id"),
+                event=record.get("event"),
+                expires=record.get("expires"),
+                notes=record.get("notes"),
+                recurring_in=record.get("recurring_in"),
             )
             return timer
 
@@ -284,36 +457,41 @@ class Timers(commands.Cog):
         channel_id: int = None,
         *,
         notes: str = None,
+        recurring_in: int = None,
     ) -> Timer:
-        """Create a new timer, will dispatch on_<event>_timer_complete when finished."""
+        """
+        Create a new timer, will dispatch on_<event>_timer_complete when finished.
+        If recurring_in is specified, the timer is re-armed to fire every recurring_in seconds until cancelled.
+        """
 
         expires = round(expires.timestamp())  # Converting it to time since epoch
         records = await self.bot.pool.fetch(
-            """INSERT INTO timers (guild_id, channel_id, user_id, event, expires, notes) VALUES ($1, $2, $3, $4, $5, $6) RETURNING *""",
+            """INSERT INTO timers (guild_id, channel_id, user_id, event, expires, notes, recurring_in) VALUES ($1, $2, $3, $4, $5, $6, $7) RETURNING *""",
             guild_id,
             channel_id,
             user_id,
             event,
             expires,
             notes,
+            recurring_in,
         )
         record = records[0]
         timer = Timer(
-            record.get("id"),
-            record.get("guild_id"),
-            record.get("user_id"),
-            record.get("event"),
-            record.get("channel_id"),
-            record.get("expires"),
-            record.get("notes"),
+            id=record.get("id"),
+            guild_id=record.get("guild_id"),
+            user_id=record.get("user_id"),
+            channel_id=record.get("channel_id"),
+            event=record.get("event"),
+            expires=record.get("expires"),
+            notes=record.get("notes"),
+            recurring_in=record.get("recurring_in"),
         )
 
         # If there is already a timer in queue, and it has an expiry that is further than the timer we just created
         # Then we reboot the dispatch_timers() function to re-check for the latest timer.
         if self.current_timer and expires < self.current_timer.expires:
             logger.debug("Reshuffled timers, this is now the latest timer.")
-            self.currenttask.cancel()
-            self.currenttask = self.bot.loop.create_task(self.dispatch_timers())
+            self.restart_dispatcher()
         elif self.current_timer is None:
             self.currenttask = self.bot.loop.create_task(self.dispatch_timers())
         return timer
@@ -329,8 +507,7 @@ class Timers(commands.Cog):
                 """DELETE FROM timers WHERE id = $1 AND guild_id = $2""", timer.id, timer.guild_id
             )
             if self.current_timer and self.current_timer.id == int(timer.id):
-                self.currenttask.cancel()
-                self.currenttask = self.bot.loop.create_task(self.dispatch_timers())
+                self.restart_dispatcher()
             return timer
 
     @tasks.loop(hours=1.0)
@@ -341,6 +518,57 @@ class Timers(commands.Cog):
         if self.currenttask is None:
             self.currenttask = self.bot.loop.create_task(self.dispatch_timers())
 
+    @commands.command(
+        name="timerstats",
+        help="Shows scheduler statistics.",
+        description="Shows pending timers by event type, the next expiry, dispatch lag and listener execution times.",
+        usage="timerstats",
+        hidden=True,
+    )
+    @commands.is_owner()
+    async def timerstats(self, ctx):
+        metrics = await self.get_metrics()
+
+        pending = "\n".join(f"{event}: {count}" for event, count in metrics["pending"].items()) or "-"
+        next_expiry = (
+            discord.utils.format_dt(
+                datetime.datetime.fromtimestamp(metrics["next_expiry"], tz=datetime.timezone.utc), style="R"
+            )
+            if metrics["next_expiry"]
+            else "`-`"
+        )
+        histogram = "\n".join(f"{bucket}: {count}" for bucket, count in metrics["lag_histogram"].items())
+        listeners = (
+            "\n".join(
+                f"{name}: {data['calls']} calls, avg {data['avg']:.3f}s, max {data['max']:.3f}s, {data['failures']} failed"
+                for name, data in metrics["listeners"].items()
+            )
+            or "-"
+        )
+
+        embed = discord.Embed(
+            title="🕘 Scheduler statistics",
+            description=f"**Pending timers:** `{metrics['pending_total']}`\n**Next expiry:** {next_expiry}\n**Dispatched:** `{metrics['dispatched']}`\n**Restarts:** `{metrics['restarts']}` | **Reshuffles:** `{metrics['reshuffles']}`",
+            color=self.bot.embed_blue,
+        )
+        embed.add_field(name="Pending by event", value=f"```{pending}```", inline=False)
+        embed.add_field(
+            name="Dispatch lag",
+            value=f"```{histogram}\navg: {metrics['lag_avg']:.3f}s | max: {metrics['lag_max']:.3f}s```",
+            inline=False,
+        )
+        embed.add_field(name="Listeners", value=f"```{listeners[:1000]}```", inline=False)
+        recurring = (
+            "\n".join(
+                f"{name}: every {data['interval']:.0f}s, {data['runs']} runs, {data['missed']} missed"
+                for name, data in metrics["recurring"].items()
+            )
+            or "-"
+        )
+        embed.add_field(name="Recurring jobs", value=f"```{recurring[:1000]}```", inline=False)
+        embed = self.bot.add_embed_footer(ctx, embed)
+        await ctx.send(embed=embed)
+
 
 def setup(bot: SnedBot):
     logger.info("Adding cog: Timers...")
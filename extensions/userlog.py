@@ -1,25 +1,72 @@
 import asyncio
-import datetime
+import collections
+import contextlib
 import json
 import logging
-from typing import Union
+import re
+from dataclasses import dataclass, field
+from typing import Counter, Deque, Dict, FrozenSet, Iterable, List, Optional, Union
 
 import discord
 from classes.bot import SnedBot
 from discord.ext import commands
+from extensions.utils.audit_log import AuditLogWatcher
+from extensions.utils.message_store import MessageStore, StoredMessage
 
 logger = logging.getLogger(__name__)
 
+# Seconds to keep waiting for audit log entries of events that are always expected to have one
+AUDIT_LOG_TIMEOUT = 3.0
+
+LOG_FLUSH_DELAY = 2.0  # Seconds to wait for more log entries before sending a partial batch
+LOG_BATCH_SIZE = 10  # Max embeds in a single message
+LOG_BATCH_CHARS = 6000  # Max combined embed length in a single message
+LOG_QUEUE_LIMIT = 200  # Max embeds waiting per channel, anything above is dropped and summarized
+
+MESSAGE_LOG_EVENTS = ("message_delete", "message_delete_mod", "message_edit")  # Events that need message contents
+
+
+@dataclass
+class LogQueue:
+    """Log embeds waiting to be sent to a single logging channel."""
+
+    embeds: Deque[discord.Embed] = field(default_factory=collections.deque)
+    full: asyncio.Event = field(default_factory=asyncio.Event)  # Set when a whole batch is ready
+    flusher: Optional[asyncio.Task] = None
+    dropped: int = 0  # Entries dropped since the last summary was sent
+
+
+@dataclass(eq=False)
+class LogFreeze:
+    """
+    A scope in which some log events of a guild are not logged individually.
+    If summary is set by the time the scope is released, it is logged with the amount of suppressed entries.
+    """
+
+    events: Optional[FrozenSet[str]] = None  # None suppresses every event
+    summary: Optional[discord.Embed] = None
+    suppressed: Counter[str] = field(default_factory=collections.Counter)
+
+    def covers(self, event: str) -> bool:
+        return self.events is None or event in self.events
+
 
 class Logging(commands.Cog):
     """User-facing logging support for important server events"""
 
     def __init__(self, bot: SnedBot):
         self.bot = bot
-        self.recently_edited = []
-        self.recently_deleted = []
         self.mod_cog = self.bot.get_cog("Moderation")
-        self.frozen_guilds = []  # List of guilds where logging is temporarily suspended
+        self.audit_log = AuditLogWatcher()  # Shared audit log fetcher, so listeners do not each query the API
+        self.frozen_guilds: Dict[int, List[LogFreeze]] = {}  # Active logging freezes per guild
+        self.log_queues: Dict[int, LogQueue] = {}  # channel_id -> queued embeds
+        self.log_stats = {"sent_messages": 0, "sent_embeds": 0, "dropped": 0, "failed": 0}
+        # Content of recent messages, so deletions & edits can be logged without the library's message cache
+        self.message_store = MessageStore(bot, spill=self.bot.config.get("message_store_spill", False))
+        self.message_logging: Dict[int, bool] = {}  # guild_id -> If message edits or deletions are logged
+        timers = self.bot.get_cog("Timers")
+        if timers:
+            self.register_recurring_jobs(timers)
         self.valid_log_events = [
             "ban",
             "kick",
@@ -78,6 +125,18 @@ class Logging(commands.Cog):
             guild_id,
         )
         await self.bot.caching.refresh(table="log_config", guild_id=guild_id)
+        self.message_logging.pop(guild_id, None)
+        if not await self.logs_messages(guild_id):
+            self.message_store.forget_guild(guild_id)
+
+    async def logs_messages(self, guild_id: int) -> bool:
+        """If a guild has a logging channel for message edits or deletions, only then are messages worth storing."""
+
+        logs = self.message_logging.get(guild_id)
+        if logs is None:
+            log_channels = await self.get_all_log_channels(guild_id)
+            logs = self.message_logging[guild_id] = any(log_channels[event] for event in MESSAGE_LOG_EVENTS)
+        return logs
 
     async def log(
         self,
@@ -90,120 +149,293 @@ class Logging(commands.Cog):
         """Log an event to the designated logging channel."""
 
         if self.bot.is_ready() and self.bot.caching.is_ready:
-            if guild_id not in self.frozen_guilds or bypass:
+            if bypass or not self.is_frozen(event, guild_id):
                 logging_channel_id = await self.get_log_channel(event, guild_id)
                 if logging_channel_id:
                     guild = self.bot.get_guild(guild_id)
                     logging_channel = guild.get_channel(logging_channel_id)
                     if logging_channel is None:
                         return
+                    if isinstance(logcontent, discord.Embed):
+                        logcontent.timestamp = discord.utils.utcnow()
+                        if file is None:
+                            return self.queue_log(logging_channel, logcontent)
                     try:
                         if isinstance(logcontent, discord.Embed):
-                            logcontent.timestamp = discord.utils.utcnow()
                             await logging_channel.send(embed=logcontent, file=file)
                         elif isinstance(logcontent, str):
                             await logging_channel.send(content=logcontent, file=file)
                     except (discord.Forbidden, discord.HTTPException):
                         return
 
-    async def freeze_logging(self, guild_id):
-        """Call to suspend logging temporarily in the given guild. Useful if a log-spammy command is being executed."""
-        if guild_id not in self.frozen_guilds:
-            self.frozen_guilds.append(guild_id)
+    def queue_log(self, channel: discord.TextChannel, embed: discord.Embed):
+        """
+        Queue an embed to be sent to a logging channel. Queued embeds are sent together,
+        up to LOG_BATCH_SIZE per message, once a batch is full or LOG_FLUSH_DELAY seconds have passed.
+        """
+
+        queue = self.log_queues.setdefault(channel.id, LogQueue())
+
+        if len(queue.embeds) >= LOG_QUEUE_LIMIT:
+            if queue.dropped == 0:
+                logger.warning(f"Log queue for channel {channel.id} is full, dropping log entries.")
+            queue.dropped += 1
+            self.log_stats["dropped"] += 1
+        else:
+            queue.embeds.append(embed)
+            if len(queue.embeds) >= LOG_BATCH_SIZE:
+                queue.full.set()
+
+        if queue.flusher is None or queue.flusher.done():
+            queue.flusher = self.bot.loop.create_task(self.flush_log_queue(channel, queue))
+
+    async def flush_log_queue(self, channel: discord.TextChannel, queue: LogQueue):
+        """Send out queued log embeds for a channel, packing as many into a message as Discord allows."""
+
+        try:
+            while queue.embeds or queue.dropped:
+                if len(queue.embeds) < LOG_BATCH_SIZE:
+                    try:
+                        await asyncio.wait_for(queue.full.wait(), timeout=LOG_FLUSH_DELAY)
+                    except asyncio.TimeoutError:
+                        pass
+                queue.full.clear()
+
+                if queue.dropped:
+                    summary = discord.Embed(
+                        title="⚠️ Logging overloaded",
+                        description=f"**{queue.dropped}** log entries were dropped in this channel due to high volume.",
+                        color=self.bot.warn_color,
+                    )
+                    summary.timestamp = discord.utils.utcnow()
+                    queue.embeds.appendleft(summary)
+                    queue.dropped = 0
+
+                batch = []
+                batch_chars = 0
+                while queue.embeds and len(batch) < LOG_BATCH_SIZE:
+                    if batch and batch_chars + len(queue.embeds[0]) > LOG_BATCH_CHARS:
+                        break
+                    embed = queue.embeds.popleft()
+                    batch.append(embed)
+                    batch_chars += len(embed)
+
+                try:
+                    await channel.send(embeds=batch)
+                    self.log_stats["sent_messages"] += 1
+                    self.log_stats["sent_embeds"] += len(batch)
+                except (discord.Forbidden, discord.HTTPException):
+                    self.log_stats["failed"] += len(batch)
+        finally:
+            if self.log_queues.get(channel.id) is queue and not queue.embeds:
+                self.log_queues.pop(channel.id)
+
+    def get_log_queue_stats(self) -> dict:
+        """Return the current depth of all log queues, along with delivery counters."""
+
+        depths = {channel_id: len(queue.embeds) for channel_id, queue in self.log_queues.items()}
+        return {
+            "queued": sum(depths.values()),
+            "queues": depths,
+            "max_depth": max(depths.values(), default=0),
+            **self.log_stats,
+        }
+
+    def cog_unload(self):
+        for queue in self.log_queues.values():
+            if queue.flusher:
+                queue.flusher.cancel()
+        if self.message_store.spill:
+            timers = self.bot.get_cog("Timers")
+            if timers:
+                timers.remove_recurring_job("message_store_flush")
+                timers.remove_recurring_job("message_store_prune")
+            self.bot.loop.create_task(self.message_store.flush())
+
+    def register_recurring_jobs(self, timers) -> None:
+        """Schedule the periodic work of this cog, called again by the Timers cog whenever it is reloaded."""
+        if self.message_store.spill:
+            timers.add_recurring_job("message_store_flush", self.message_store.flush, 60.0, first_run=60.0)
+            timers.add_recurring_job("message_store_prune", self.message_store.prune, 3600.0, jitter=300.0)
+
+    def is_frozen(self, event: str, guild_id: int) -> bool:
+        """Check if an event is currently suppressed in a guild, counting it towards the freezes covering it."""
+
+        frozen = False
+        for freeze in self.frozen_guilds.get(guild_id, ()):
+            if freeze.covers(event):
+                freeze.suppressed[event] += 1
+                frozen = True
+        return frozen
+
+    @contextlib.asynccontextmanager
+    async def freeze_logging(self, guild_id: int, events: Iterable[str] = None, grace: float = 5.0):
+        """
+        Suppress the given log events (or all of them) in a guild while the block is running.
+        Useful if a log-spammy command is being executed. Freezes can overlap, each only releases itself.
+        Events caused by the block may arrive late, so the freeze is released grace seconds after exiting,
+        without blocking the caller. Set summary on the yielded LogFreeze to log a summary once it is released.
+
+        Example:
+        async with logging_cog.freeze_logging(guild.id, ["ban"]) as freeze:
+            ...
+            freeze.summary = discord.Embed(...)
+        """
+
+        freeze = LogFreeze(events=frozenset(events) if events else None)
+        self.frozen_guilds.setdefault(guild_id, []).append(freeze)
+        try:
+            yield freeze
+        finally:
+            self.bot.loop.create_task(self.release_freeze(guild_id, freeze, grace))
+
+    async def release_freeze(self, guild_id: int, freeze: LogFreeze, grace: float):
+        """Remove a freeze after the grace period, then log its summary, if any."""
+
+        await asyncio.sleep(grace)
+        freezes = self.frozen_guilds.get(guild_id, [])
+        if freeze in freezes:
+            freezes.remove(freeze)
+        if not freezes:
+            self.frozen_guilds.pop(guild_id, None)
+
+        if freeze.summary is None:
+            return
+
+        if freeze.suppressed:
+            freeze.summary.add_field(
+                name="Suppressed log entries",
+                value="\n".join(f"`{event}`: **{count}**" for event, count in freeze.suppressed.most_common()),
+                inline=False,
+            )
+            event = freeze.suppressed.most_common(1)[0][0]  # Log it where most suppressed entries would have gone
+        elif freeze.events:
+            event = sorted(freeze.events)[0]
+        else:
+            return
+        await self.log(event, freeze.summary, guild_id, bypass=True)
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if message.guild is None or message.author.bot:
+            return
+        if await self.logs_messages(message.guild.id):
+            self.message_store.add(message)
 
-    async def unfreeze_logging(self, guild_id):
-        """Call to stop suspending the logging in a given guild."""
-        await asyncio.sleep(5)  # For any pending actions to stop
-        if guild_id in self.frozen_guilds:
-            self.frozen_guilds.remove(guild_id)
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.message_store.forget_guild(guild.id)
+        self.message_logging.pop(guild.id, None)
+
+    def format_author(self, guild: discord.Guild, author_id: int) -> str:
+        """Format a message author from cache, as stored messages only know the author's ID."""
+        author = guild.get_member(author_id) or self.bot.get_user(author_id)
+        return f"{author} ({author_id})" if author else f"Unknown user ({author_id})"
+
+    def get_moderator_id(self, moderator, reason: str) -> Optional[int]:
+        """
+        Get the ID of the moderator responsible for an audit log entry.
+        Actions the bot took on behalf of a moderator carry the moderator's ID in the reason, see Moderation.format_reason().
+        """
+        if moderator == self.bot.user and reason:
+            match = re.search(r"\((\d+)\): ", reason)
+            return int(match.group(1)) if match else moderator.id
+        return getattr(moderator, "id", None)
 
     # Message deletion logging
 
-    # First, if the message was cached, provide detailed info
+    # Works from the message store, so messages outside the library's cache are logged too
     @commands.Cog.listener()
-    async def on_message_delete(self, message):
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
         # Guild-only, self ignored
-        if message.guild is None or message.author.bot:
+        if payload.guild_id is None:
             return
+        guild = self.bot.get_guild(payload.guild_id)
+        message = await self.message_store.pop(payload.guild_id, payload.message_id)
+        if message is None and payload.cached_message and not payload.cached_message.author.bot:
+            message = StoredMessage.from_message(payload.cached_message)
+        if message is None or guild is None:  # Bot message or unknown content
+            return
+
         # Then do info collection & dump
         moderator = None
         try:
-            async for entry in message.guild.audit_logs():
-                if (
-                    entry.action == discord.AuditLogAction.message_delete
-                    and (datetime.datetime.now(datetime.timezone.utc) - entry.created_at).total_seconds() < 15
-                ):
-                    if entry.target == message.author:
-                        moderator = entry.user
-                    break
-                else:
-                    break
+            entry = await self.audit_log.find(guild, discord.AuditLogAction.message_delete, message.author_id)
+            if entry:
+                moderator = entry.user
         except discord.Forbidden:
             pass
         contentfield = message.content
         if contentfield == "":
             contentfield = "//The message did not contain text."
-        if message.attachments:
+        if message.has_attachments:
             contentfield = f"{message.content}\n//The message contained an attachment."
-        if message.embeds:
+        if message.has_embeds:
             contentfield = contentfield + "\n//The message contained an embed."
+        author = self.format_author(guild, message.author_id)
 
         if moderator != None:  # If this was deleted by a mod
             embed = discord.Embed(
                 title=f"🗑️ Message deleted by Moderator",
-                description=f"**Message author:** `{message.author} ({message.author.id})`\n**Moderator:** `{moderator} ({moderator.id})`\n**Channel:** {message.channel.mention}\n**Message content:** ```{contentfield}```",
+                description=f"**Message author:** `{author}`\n**Moderator:** `{moderator} ({moderator.id})`\n**Channel:** <#{payload.channel_id}>\n**Message content:** ```{contentfield}```",
                 color=self.bot.error_color,
             )
-            await self.log("message_delete_mod", embed, message.guild.id)
+            await self.log("message_delete_mod", embed, payload.guild_id)
         else:
             # Logging channel
             embed = discord.Embed(
                 title=f"🗑️ Message deleted",
-                description=f"**Message author:** `{message.author} ({message.author.id})`\n**Channel:** {message.channel.mention}\n**Message content:** ```{contentfield}```",
+                description=f"**Message author:** `{author}`\n**Channel:** <#{payload.channel_id}>\n**Message content:** ```{contentfield}```",
                 color=self.bot.error_color,
             )
-            await self.log("message_delete", embed, message.guild.id)
+            await self.log("message_delete", embed, payload.guild_id)
 
     # Message editing logging
 
-    # First, if the message was cached, provide detailed info
     @commands.Cog.listener()
-    async def on_message_edit(self, before, after):
-        if after.guild is None or before.content == after.content:
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        # Edits without a content key are embed updates, e.g. link previews loading
+        if payload.guild_id is None or "content" not in payload.data:
             return
-        # Add it to the recently deleted so on_raw_message_edit will ignore this
-        self.recently_edited.append(after.id)
+        if payload.data.get("author", {}).get("bot"):
+            return
+        guild = self.bot.get_guild(payload.guild_id)
+        if guild is None:
+            return
+
+        after_content = payload.data["content"]
+        before = await self.message_store.update(payload.guild_id, payload.message_id, after_content)
+        if before is None and payload.cached_message:
+            before = StoredMessage.from_message(payload.cached_message)
+        if before is None or before.content == after_content:
+            return
+
         # Then do info collection & dump
         before_content = before.content if len(before.content) < 1800 else before.content[:1800] + "..."
-        after_content = after.content if len(after.content) < 1800 else after.content[:1800] + "..."
-        if not after.author.bot:
-            embed = discord.Embed(
-                title=f"🖊️ Message edited",
-                description=f"**Message author:** `{after.author} ({after.author.id})`\n**Channel:** {after.channel.mention}\n**Before:** ```{before_content}``` \n**After:** ```{after_content}```\n[Jump!]({after.jump_url})",
-                color=self.bot.embed_blue,
-            )
-            await self.log("message_edit", embed, after.guild.id)
+        after_content = after_content if len(after_content) < 1800 else after_content[:1800] + "..."
+        jump_url = f"https://discord.com/channels/{payload.guild_id}/{payload.channel_id}/{payload.message_id}"
+        embed = discord.Embed(
+            title=f"🖊️ Message edited",
+            description=f"**Message author:** `{self.format_author(guild, before.author_id)}`\n**Channel:** <#{payload.channel_id}>\n**Before:** ```{before_content}``` \n**After:** ```{after_content}```\n[Jump!]({jump_url})",
+            color=self.bot.embed_blue,
+        )
+        await self.log("message_edit", embed, payload.guild_id)
 
     @commands.Cog.listener()
     async def on_raw_bulk_message_delete(self, payload):
         if payload.guild_id == None:
             return
+        self.message_store.discard(payload.guild_id, payload.message_ids)
         # Produce bulk msg generic log
+        moderator = "Discord"
+        guild = self.bot.get_guild(payload.guild_id)
         try:
-            moderator = "Discord"
-            guild = self.bot.get_guild(payload.guild_id)
-            async for entry in guild.audit_logs():  # Get the bot that did it
-                if (
-                    entry.action == discord.AuditLogAction.message_bulk_delete
-                    and (datetime.datetime.now(datetime.timezone.utc) - entry.created_at).total_seconds() < 15
-                ):
-                    moderator = entry.user
-                    break
-                else:
-                    break
+            # Get the bot that did it
+            entry = await self.audit_log.find(guild, discord.AuditLogAction.message_bulk_delete)
+            if entry:
+                moderator = entry.user
         except discord.Forbidden:
             pass
-        guild = self.bot.get_guild(payload.guild_id)
         channel = guild.get_channel(payload.channel_id)
         embed = discord.Embed(
             title=f"🗑️ Bulk message deletion",
@@ -226,17 +458,9 @@ class Logging(commands.Cog):
     async def on_guild_role_delete(self, role):
         try:
             moderator = "Undefined"
-            async for entry in role.guild.audit_logs():
-                if entry.action == discord.AuditLogAction.role_delete:
-                    if (
-                        entry.target == role
-                        or entry.target.id == role.id
-                        and (datetime.datetime.now(datetime.timezone.utc) - entry.created_at).total_seconds() < 15
-                    ):
-                        moderator = entry.user
-                    break
-                else:
-                    break
+            entry = await self.audit_log.find(role.guild, discord.AuditLogAction.role_delete, role.id)
+            if entry:
+                moderator = entry.user
         except discord.Forbidden:
             return
         embed = discord.Embed(
@@ -250,15 +474,9 @@ class Logging(commands.Cog):
     async def on_guild_channel_delete(self, channel):
         try:
             moderator = "Undefined"
-            async for entry in channel.guild.audit_logs():
-                if entry.action == discord.AuditLogAction.channel_delete:
-                    if (entry.target == channel or entry.target.id == channel.id) and (
-                        datetime.datetime.now(datetime.timezone.utc) - entry.created_at
-                    ).total_seconds() < 15:
-                        moderator = entry.user
-                    break
-                else:
-                    break
+            entry = await self.audit_log.find(channel.guild, discord.AuditLogAction.channel_delete, channel.id)
+            if entry:
+                moderator = entry.user
         except discord.Forbidden:
             return
         embed = discord.Embed(
@@ -274,16 +492,9 @@ class Logging(commands.Cog):
     async def on_guild_channel_create(self, channel):
         try:
             moderator = "Undefined"
-            async for entry in channel.guild.audit_logs():
-                if (
-                    entry.action == discord.AuditLogAction.channel_create
-                    and (datetime.datetime.now(datetime.timezone.utc) - entry.created_at).total_seconds() < 15
-                ):
-                    if entry.target == channel or entry.target.id == channel.id:
-                        moderator = entry.user
-                    break
-                else:
-                    break
+            entry = await self.audit_log.find(channel.guild, discord.AuditLogAction.channel_create, channel.id)
+            if entry:
+                moderator = entry.user
         except discord.Forbidden:
             return
         embed = discord.Embed(
@@ -297,16 +508,9 @@ class Logging(commands.Cog):
     async def on_guild_role_create(self, role):
         try:
             moderator = "Undefined"
-            async for entry in role.guild.audit_logs():
-                if (
-                    entry.action == discord.AuditLogAction.role_create
-                    and (datetime.datetime.now(datetime.timezone.utc) - entry.created_at).total_seconds() < 15
-                ):
-                    if entry.target == role or entry.target.id == role.id:
-                        moderator = entry.user
-                    break
-                else:
-                    break
+            entry = await self.audit_log.find(role.guild, discord.AuditLogAction.role_create, role.id)
+            if entry:
+                moderator = entry.user
         except discord.Forbidden:
             return
         embed = discord.Embed(
@@ -320,16 +524,9 @@ class Logging(commands.Cog):
     async def on_guild_role_update(self, before, after):
         try:
             moderator = None
-            async for entry in after.guild.audit_logs():
-                if (
-                    entry.action == discord.AuditLogAction.role_update
-                    and (datetime.datetime.now(datetime.timezone.utc) - entry.created_at).total_seconds() < 15
-                ):
-                    if entry.target == after or entry.target.id == after.id:
-                        moderator = entry.user
-                    break
-                else:
-                    break
+            entry = await self.audit_log.find(after.guild, discord.AuditLogAction.role_update, after.id)
+            if entry:
+                moderator = entry.user
         except discord.Forbidden:
             return
         if moderator:
@@ -344,15 +541,9 @@ class Logging(commands.Cog):
     async def on_guild_update(self, before, after):
         try:
             moderator = "Undefined"
-            async for entry in after.audit_logs():
-                if (
-                    entry.action == discord.AuditLogAction.guild_update
-                    and (datetime.datetime.now(datetime.timezone.utc) - entry.created_at).total_seconds() < 15
-                ):
-                    moderator = entry.user
-                    break
-                else:
-                    break
+            entry = await self.audit_log.find(after, discord.AuditLogAction.guild_update)
+            if entry:
+                moderator = entry.user
         except discord.Forbidden:
             return
         if moderator != "Undefined":  # Necessary as e.g. Nitro boosts trigger guild update
@@ -366,23 +557,14 @@ class Logging(commands.Cog):
     @commands.Cog.listener()
     async def on_member_unban(self, guild, user):
 
-        await asyncio.sleep(1)
-
         try:
             moderator = "Undefined"
             reason = "No reason provided"
-            async for entry in guild.audit_logs():
-                if (
-                    entry.target == user
-                    and entry.action == discord.AuditLogAction.unban
-                    and (datetime.datetime.now(datetime.timezone.utc) - entry.created_at).total_seconds() < 15
-                ):
-                    moderator = entry.user
-                    if entry.reason:
-                        reason = entry.reason
-                    break
-                else:
-                    break
+            entry = await self.audit_log.find(guild, discord.AuditLogAction.unban, user.id, timeout=AUDIT_LOG_TIMEOUT)
+            if entry:
+                moderator = entry.user
+                if entry.reason:
+                    reason = entry.reason
         except discord.Forbidden:
             return
         embed = discord.Embed(
@@ -395,30 +577,19 @@ class Logging(commands.Cog):
     @commands.Cog.listener()
     async def on_member_remove(self, member):
 
-        await asyncio.sleep(1)  # Wait for audit log to be present
-
         is_kick = False
         moderator = "Unknown"
         reason = "Error retrieving data from audit logs! Ensure the bot has permissions to view them!"
         try:
-            async for entry in member.guild.audit_logs():
-                if (
-                    entry.action == discord.AuditLogAction.kick
-                    and (datetime.datetime.now(datetime.timezone.utc) - entry.created_at).total_seconds() < 15
-                ):
-                    if entry.target == member:
-                        moderator = entry.user
-                        reason = entry.reason
-                        is_kick = True
-                        break
-                elif (
-                    entry.action == discord.AuditLogAction.ban
-                    and (datetime.datetime.now(datetime.timezone.utc) - entry.created_at).total_seconds() < 15
-                ):
-                    if entry.target == member:
-                        return  # bans get logged seperately
-                else:
-                    break
+            entry = await self.audit_log.find(
+                member.guild, (discord.AuditLogAction.kick, discord.AuditLogAction.ban), member.id
+            )
+            if entry and entry.action == discord.AuditLogAction.ban:
+                return  # bans get logged seperately
+            elif entry:
+                moderator = entry.user
+                reason = entry.reason
+                is_kick = True
         except discord.Forbidden:
             pass
 
@@ -430,12 +601,20 @@ class Logging(commands.Cog):
             )
             await self.log("kick", embed, member.guild.id)
 
+            moderator_id = self.get_moderator_id(moderator, reason)
             if moderator != "Unknown" and moderator == self.bot.user:
                 moderator = reason.split(" ")[0]  # Get actual moderator, not the bot
                 reason = reason.split("): ", maxsplit=1)[1]  # Remove author
             if reason and len(reason) > 240:
                 reason = reason[:240] + "..."
-            await self.mod_cog.add_note(member.id, member.guild.id, f"🚪👈 **Kicked by {moderator}:** {reason}")
+            await self.mod_cog.add_note(
+                member.id,
+                member.guild.id,
+                f"🚪👈 **Kicked by {moderator}:** {reason}",
+                action="kick",
+                moderator_id=moderator_id,
+                reason=reason,
+            )
 
         else:
             embed = discord.Embed(
@@ -450,19 +629,13 @@ class Logging(commands.Cog):
     @commands.Cog.listener()
     async def on_member_ban(self, guild, user):
 
-        await asyncio.sleep(1)  # Wait for audit log to be present
         moderator = "Unknown"
         reason = "Error retrieving data from audit logs! Ensure the bot has permissions to view them!"
         try:
-            async for entry in guild.audit_logs():
-                if (
-                    entry.action == discord.AuditLogAction.ban
-                    and (datetime.datetime.now(datetime.timezone.utc) - entry.created_at).total_seconds() < 15
-                ):
-                    if entry.target == user:
-                        moderator = entry.user
-                        reason = entry.reason
-                        break
+            entry = await self.audit_log.find(guild, discord.AuditLogAction.ban, user.id, timeout=AUDIT_LOG_TIMEOUT)
+            if entry:
+                moderator = entry.user
+                reason = entry.reason
         except discord.Forbidden:
             pass
 
@@ -473,12 +646,20 @@ class Logging(commands.Cog):
         )
         await self.log("ban", embed, guild.id)
 
+        moderator_id = self.get_moderator_id(moderator, reason)
         if moderator != "Unknown" and moderator == self.bot.user:
             moderator = reason.split(" ")[0]  # Get actual moderator, not the bot
             reason = reason.split("): ", maxsplit=1)[1]  # Remove author
         if reason and len(reason) > 240:
             reason = reason[:240] + "..."
-        await self.mod_cog.add_note(user.id, guild.id, f"🔨 **Banned by {moderator}:** {reason}")
+        await self.mod_cog.add_note(
+            user.id,
+            guild.id,
+            f"🔨 **Banned by {moderator}:** {reason}",
+            action="ban",
+            moderator_id=moderator_id,
+            reason=reason,
+        )
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
@@ -500,26 +681,23 @@ class Logging(commands.Cog):
     async def on_member_update(self, before, after):
 
         if before.communication_disabled_until != after.communication_disabled_until:
-            await asyncio.sleep(1)  # Wait for audit log to be present
             moderator = "Discord"
             reason = "Error retrieving data from audit logs! Ensure the bot has permissions to view them!"
 
             try:
-                async for entry in after.guild.audit_logs():
-                    if (
-                        entry.action == discord.AuditLogAction.member_update
-                        and (datetime.datetime.now(datetime.timezone.utc) - entry.created_at).total_seconds() < 15
-                    ):
-                        if entry.target == before:
-                            moderator = entry.user
-                            reason = entry.reason if entry.reason else "No reason provided"
-                            break
+                entry = await self.audit_log.find(
+                    after.guild, discord.AuditLogAction.member_update, after.id, timeout=AUDIT_LOG_TIMEOUT
+                )
+                if entry:
+                    moderator = entry.user
+                    reason = entry.reason if entry.reason else "No reason provided"
             except discord.Forbidden:
                 pass
 
             if reason and len(reason) > 200:
                 reason = reason[:200] + "..."
 
+            moderator_id = self.get_moderator_id(moderator, reason)
             if (
                 moderator != "Discord"
                 and moderator == self.bot.user
@@ -536,6 +714,9 @@ class Logging(commands.Cog):
                     after.id,
                     after.guild.id,
                     f"🔉 **Timeout removed by {moderator}:** {reason}",
+                    action="timeout_remove",
+                    moderator_id=moderator_id,
+                    reason=reason,
                 )
                 embed = discord.Embed(
                     title=f"🔉 User timeout removed",
@@ -548,6 +729,9 @@ class Logging(commands.Cog):
                     after.id,
                     after.guild.id,
                     f"🔇 **Timed out by {moderator} until {discord.utils.format_dt(after.communication_disabled_until)}:** {reason}",
+                    action="timeout",
+                    moderator_id=moderator_id,
+                    reason=reason,
                 )
                 embed = discord.Embed(
                     title=f"🔇 User timed out",
@@ -572,16 +756,9 @@ class Logging(commands.Cog):
             # Checking Auditlog for moderator who did it, if applicable
             try:
                 moderator = "Undefined"
-                async for entry in after.guild.audit_logs():
-                    if (
-                        entry.action == discord.AuditLogAction.member_role_update
-                        and (datetime.datetime.now(datetime.timezone.utc) - entry.created_at).total_seconds() < 15
-                    ):
-                        if entry.target == after:
-                            moderator = entry.user
-                        break
-                    else:
-                        break
+                entry = await self.audit_log.find(after.guild, discord.AuditLogAction.member_role_update, after.id)
+                if entry:
+                    moderator = entry.user
             except discord.Forbidden:
                 return
             if len(add_diff) != 0:
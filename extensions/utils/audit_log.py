@@ -0,0 +1,129 @@
+import asyncio
+import datetime
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AuditLogWaiter:
+    """A listener waiting for an audit log entry to show up."""
+
+    actions: Tuple[discord.AuditLogAction, ...]
+    target_id: Optional[int]
+    deadline: float
+    future: asyncio.Future
+
+    def match(self, entries: dict) -> Optional[discord.AuditLogEntry]:
+        """Return the first entry from the guild's index satisfying this waiter, if any."""
+        for action in self.actions:
+            entry = entries.get((action, self.target_id))
+            if entry:
+                return entry
+
+
+@dataclass
+class GuildAuditLog:
+    """Recently seen audit log entries & pending waiters of a single guild."""
+
+    # (action, target_id) -> newest recent entry, (action, None) holds the newest entry of an action regardless of target
+    entries: Dict[Tuple[discord.AuditLogAction, Optional[int]], discord.AuditLogEntry] = field(default_factory=dict)
+    waiters: List[AuditLogWaiter] = field(default_factory=list)
+    poller: Optional[asyncio.Task] = None
+
+
+class AuditLogWatcher:
+    """
+    Shares audit log requests between all listeners of a guild.
+    The first listener asking for an entry starts a poller for that guild, which fetches the audit log
+    once per poll_interval for as long as anyone is waiting, so a burst of events results in a single request
+    instead of one per event.
+    """
+
+    def __init__(self, poll_interval: float = 1.0, max_age: float = 15.0, fetch_limit: int = 50):
+        self.poll_interval = poll_interval  # Also gives Discord time to write the audit log entry
+        self.max_age = max_age  # Entries older than this many seconds are not considered related to an event
+        self.fetch_limit = fetch_limit
+        self.guilds: Dict[int, GuildAuditLog] = {}
+        self.requests = 0  # Amount of audit log fetches performed, for diagnostics
+
+    def _is_recent(self, entry: discord.AuditLogEntry) -> bool:
+        return (datetime.datetime.now(datetime.timezone.utc) - entry.created_at).total_seconds() < self.max_age
+
+    async def find(
+        self,
+        guild: discord.Guild,
+        action: Union[discord.AuditLogAction, Tuple[discord.AuditLogAction, ...]],
+        target_id: int = None,
+        timeout: float = 0,
+    ) -> Optional[discord.AuditLogEntry]:
+        """
+        Wait for a recent audit log entry of the given action(s), optionally about a specific target.
+        Returns the entry, or None if none showed up until the next poll after timeout seconds.
+        Raises discord.Forbidden if the bot cannot view the audit log.
+        """
+
+        actions = action if isinstance(action, tuple) else (action,)
+        state = self.guilds.setdefault(guild.id, GuildAuditLog())
+        loop = asyncio.get_running_loop()
+
+        waiter = AuditLogWaiter(actions, target_id, loop.time() + timeout, loop.create_future())
+        state.waiters.append(waiter)
+        if state.poller is None or state.poller.done():
+            state.poller = loop.create_task(self._poll(guild, state))
+
+        try:
+            return await waiter.future
+        finally:
+            if waiter in state.waiters:
+                state.waiters.remove(waiter)
+
+    async def _poll(self, guild: discord.Guild, state: GuildAuditLog):
+        """Fetch the audit log once per interval while there are listeners waiting, and hand out matching entries."""
+
+        loop = asyncio.get_running_loop()
+        try:
+            while state.waiters:
+                await asyncio.sleep(self.poll_interval)
+
+                try:
+                    self.requests += 1
+                    fetched = [entry async for entry in guild.audit_logs(limit=self.fetch_limit)]
+                except discord.Forbidden as error:
+                    for waiter in state.waiters:
+                        if not waiter.future.done():
+                            waiter.future.set_exception(error)
+                    state.waiters.clear()
+                    return
+                except discord.HTTPException as error:
+                    logger.warning(f"Failed fetching audit log for guild {guild.id}: {error}")
+                    fetched = []
+
+                # Entries are returned newest first, so the first entry seen for a key wins
+                state.entries = {}
+                for entry in fetched:
+                    if not self._is_recent(entry):
+                        break
+                    state.entries.setdefault((entry.action, getattr(entry.target, "id", None)), entry)
+                    state.entries.setdefault((entry.action, None), entry)
+
+                now = loop.time()
+                for waiter in list(state.waiters):
+                    if waiter.future.done():
+                        state.waiters.remove(waiter)
+                        continue
+                    entry = waiter.match(state.entries)
+                    if entry or now >= waiter.deadline:
+                        waiter.future.set_result(entry)
+                        state.waiters.remove(waiter)
+        finally:
+            for waiter in state.waiters:  # Only left over if the poller stopped unexpectedly
+                if not waiter.future.done():
+                    waiter.future.set_result(None)
+            state.waiters.clear()
+            if self.guilds.get(guild.id) is state:
+                self.guilds.pop(guild.id)
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BulkActionReport:
+    """The outcome of a bulk action, per target."""
+
+    total: int
+    succeeded: List[int] = field(default_factory=list)
+    failed: Dict[int, str] = field(default_factory=dict)  # target_id -> reason
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+    cancelled: bool = False
+
+    @property
+    def done(self) -> int:
+        return len(self.succeeded) + len(self.failed)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Targets processed per second."""
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    def error_summary(self) -> Dict[str, int]:
+        """The amount of failures grouped by reason."""
+        summary = {}
+        for reason in self.failed.values():
+            summary[reason] = summary.get(reason, 0) + 1
+        return summary
+
+    def to_text(self) -> str:
+        """A plain-text per-target report, to be attached as a file."""
+        lines = [f"Succeeded: {len(self.succeeded)}/{self.total} | Failed: {len(self.failed)} | {self.elapsed:.1f}s\n"]
+        lines.extend(f"{target_id} | OK" for target_id in self.succeeded)
+        lines.extend(f"{target_id} | FAILED: {reason}" for target_id, reason in self.failed.items())
+        return "\n".join(lines)
+
+
+class BulkActionExecutor:
+    """
+    Runs an API action against many targets with bounded concurrency.
+    The HTTP client already waits on Discord's rate limit buckets, so concurrency only decides how many requests
+    are queued against the bucket at once. Rate limits & server errors that still surface are retried with
+    exponential backoff, honouring Retry-After if Discord sent one. Progress is reported through an optional
+    callback at most once per progress_interval seconds.
+    """
+
+    def __init__(
+        self,
+        action: Callable[[int], Awaitable],
+        *,
+        concurrency: int = 5,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        progress: Callable[[BulkActionReport], Awaitable] = None,
+        progress_interval: float = 3.0,
+        on_result: Callable[[int, Optional[str]], Awaitable] = None,
+    ):
+        self.action = action
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.on_result = on_result  # Called with (target_id, error or None) after every target
+        self.report: Optional[BulkActionReport] = None
+        self._cancelled = False
+
+    def cancel(self) -> None:
+        """Stop picking up new targets, targets already in flight are finished."""
+        self._cancelled = True
+
+    def _retry_after(self, error: discord.HTTPException, attempt: int) -> Optional[float]:
+        """How long to wait before retrying a failed request, or None if it should not be retried."""
+
+        if attempt >= self.max_retries or not (error.status == 429 or error.status >= 500):
+            return None
+
+        headers = getattr(error.response, "headers", None) or {}
+        retry_after = headers.get("Retry-After") or headers.get("X-RateLimit-Reset-After")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return self.backoff * 2**attempt + random.uniform(0, self.backoff)
+
+    async def _run_one(self, target_id: int) -> Optional[str]:
+        """Perform the action on a single target, returning the reason of failure if any."""
+
+        attempt = 0
+        while True:
+            try:
+                await self.action(target_id)
+            except discord.NotFound:
+                return "Unknown user"
+            except discord.Forbidden:
+                return "Missing permissions"
+            except discord.HTTPException as error:
+                delay = self._retry_after(error, attempt)
+                if delay is None:
+                    return f"{error.status}: {error.text or 'HTTP error'}"
+                attempt += 1
+                logger.debug(f"Bulk action on {target_id} failed with {error.status}, retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+            else:
+                return None
+
+    async def _worker(self, queue: "asyncio.Queue[int]") -> None:
+        while not self._cancelled:
+            try:
+                target_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            error = await self._run_one(target_id)
+            if error is None:
+                self.report.succeeded.append(target_id)
+            else:
+                self.report.failed[target_id] = error
+
+            if self.on_result:
+                try:
+                    await self.on_result(target_id, error)
+                except Exception as callback_error:  # A failed checkpoint must not orphan the other workers
+                    logger.error(f"Bulk action result callback failed for {target_id}: {callback_error}")
+
+    async def _report_progress(self) -> None:
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            try:
+                await self.progress(self.report)
+            except discord.HTTPException as error:
+                logger.debug(f"Failed reporting bulk action progress: {error}")
+
+    async def run(self, targets: Iterable[int]) -> BulkActionReport:
+        """Perform the action on every target, and return a report once all of them are done."""
+
+        targets = list(dict.fromkeys(targets))  # Dedupe, keeping order
+        self.report = BulkActionReport(total=len(targets))
+
+        queue: "asyncio.Queue[int]" = asyncio.Queue()
+        for target_id in targets:
+            queue.put_nowait(target_id)
+
+        reporter = asyncio.create_task(self._report_progress()) if self.progress else None
+        try:
+            await asyncio.gather(*(self._worker(queue) for _ in range(min(self.concurrency, len(targets)) or 1)))
+        finally:
+            if reporter:
+                reporter.cancel()
+            self.report.finished_at = time.monotonic()
+            self.report.cancelled = self._cancelled
+
+        if self.progress:
+            try:
+                await self.progress(self.report)
+            except discord.HTTPException as error:
+                logger.debug(f"Failed reporting bulk action progress: {error}")
+
+        return self.report
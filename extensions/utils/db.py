@@ -0,0 +1,49 @@
+import logging
+from typing import Iterable, List, Optional, Sequence
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+
+async def bulk_upsert(
+    pool: asyncpg.Pool,
+    table: str,
+    columns: Sequence[str],
+    records: Iterable[tuple],
+    *,
+    conflict: Sequence[str],
+    update: Optional[List[str]] = None,
+) -> int:
+    """
+    Insert many rows into a table in a single round-trip, by COPYing them into a temporary table
+    and upserting from there. Rows conflicting on the conflict columns are left alone,
+    unless update lists columns to overwrite with the new values.
+    Table & column names are interpolated into the query, they must never come from user input.
+    Returns the amount of rows inserted or updated.
+    """
+
+    records = list(records)
+    if not records:
+        return 0
+
+    column_list = ", ".join(columns)
+    if update:
+        action = "UPDATE SET " + ", ".join(f"{column} = EXCLUDED.{column}" for column in update)
+    else:
+        action = "NOTHING"
+
+    async with pool.acquire() as con:
+        async with con.transaction():
+            await con.execute(f"""CREATE TEMP TABLE _bulk_{table} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP""")
+            await con.copy_records_to_table(f"_bulk_{table}", records=records, columns=list(columns))
+            status = await con.execute(
+                f"""
+                INSERT INTO {table} ({column_list})
+                SELECT {column_list} FROM _bulk_{table}
+                ON CONFLICT ({", ".join(conflict)}) DO {action}"""
+            )
+
+    count = int(status.split()[-1])  # INSERT 0 <count>
+    logger.debug(f"Bulk upserted {count}/{len(records)} rows into {table}.")
+    return count
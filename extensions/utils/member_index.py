@@ -0,0 +1,334 @@
+import array
+import asyncio
+import collections
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# MemberSnapshot.flags bits
+IS_BOT = 1 << 0
+HAS_AVATAR = 1 << 1
+IS_DELETED = 1 << 2  # Deleted accounts have a discriminator of 0000
+
+
+class MemberRow(NamedTuple):
+    id: int
+    name: str
+    created_at: float  # Unix timestamp
+    joined_at: float  # Unix timestamp, 0 if unknown
+    flags: int
+    role_count: int
+
+
+@dataclass
+class MemberFilter:
+    """Criteria a member must all satisfy to be matched, timestamps are Unix timestamps."""
+
+    regex: Optional["re.Pattern"] = None
+    no_avatar: bool = False
+    no_roles: bool = False
+    created_after: Optional[float] = None
+    joined_after: Optional[float] = None
+    joined_before: Optional[float] = None
+    exclude: Set[int] = field(default_factory=set)
+
+
+class MemberSnapshot:
+    """
+    Member attributes of a single guild stored column-wise in flat arrays, so filtering a guild's members
+    is a couple of tight passes over numbers instead of attribute lookups on hundreds of thousands of Member objects.
+    Rows are kept up to date by upserting & removing members, removal swaps the last row into the freed slot.
+    """
+
+    def __init__(self):
+        self.ids = array.array("Q")
+        self.created_at = array.array("d")
+        self.joined_at = array.array("d")
+        self.flags = bytearray()
+        self.role_counts = array.array("H")
+        self.names: List[str] = []
+        self.positions: Dict[int, int] = {}  # member_id -> row
+
+    @classmethod
+    def from_members(cls, members: Iterable[discord.Member]) -> "MemberSnapshot":
+        snapshot = cls()
+        for member in members:
+            snapshot.upsert(member)
+        return snapshot
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, member_id: int) -> bool:
+        return member_id in self.positions
+
+    def upsert(self, member: discord.Member) -> None:
+        """Add a member, or refresh its row if it is already present."""
+
+        flags = (
+            (IS_BOT if member.bot else 0)
+            | (HAS_AVATAR if member.avatar is not None else 0)
+            | (IS_DELETED if member.discriminator == "0000" else 0)
+        )
+        created_at = member.created_at.timestamp()
+        joined_at = member.joined_at.timestamp() if member.joined_at else 0.0
+        role_count = min(len(member.roles) - 1, 65535)  # Excluding @everyone
+
+        row = self.positions.get(member.id)
+        if row is None:
+            self.positions[member.id] = len(self.ids)
+            self.ids.append(member.id)
+            self.created_at.append(created_at)
+            self.joined_at.append(joined_at)
+            self.flags.append(flags)
+            self.role_counts.append(role_count)
+            self.names.append(member.name)
+        else:
+            self.created_at[row] = created_at
+            self.joined_at[row] = joined_at
+            self.flags[row] = flags
+            self.role_counts[row] = role_count
+            self.names[row] = member.name
+
+    def remove(self, member_id: int) -> None:
+        row = self.positions.pop(member_id, None)
+        if row is None:
+            return
+
+        last = len(self.ids) - 1
+        if row != last:
+            self.ids[row] = self.ids[last]
+            self.created_at[row] = self.created_at[last]
+            self.joined_at[row] = self.joined_at[last]
+            self.flags[row] = self.flags[last]
+            self.role_counts[row] = self.role_counts[last]
+            self.names[row] = self.names[last]
+            self.positions[self.ids[row]] = row
+
+        self.ids.pop()
+        self.created_at.pop()
+        self.joined_at.pop()
+        self.flags.pop()
+        self.role_counts.pop()
+        self.names.pop()
+
+    def row(self, member_id: int) -> Optional[MemberRow]:
+        row = self.positions.get(member_id)
+        if row is None:
+            return None
+        return MemberRow(
+            self.ids[row],
+            self.names[row],
+            self.created_at[row],
+            self.joined_at[row],
+            self.flags[row],
+            self.role_counts[row],
+        )
+
+    def filter(self, criteria: MemberFilter) -> List[int]:
+        """
+        Return the ids of all members that are not bots or deleted users, and satisfy every criteria.
+        Each criteria only runs on the rows left over by the previous ones, cheapest first, with the regex last.
+        """
+
+        flags = self.flags
+        excluded = IS_BOT | IS_DELETED | (HAS_AVATAR if criteria.no_avatar else 0)
+        rows = [row for row, value in enumerate(flags) if not value & excluded]
+
+        if criteria.no_roles:
+            role_counts = self.role_counts
+            rows = [row for row in rows if role_counts[row] == 0]
+        if criteria.created_after is not None:
+            created_at, offset = self.created_at, criteria.created_after
+            rows = [row for row in rows if created_at[row] > offset]
+        if criteria.joined_after is not None:
+            joined_at, offset = self.joined_at, criteria.joined_after
+            rows = [row for row in rows if joined_at[row] > offset]
+        if criteria.joined_before is not None:
+            joined_at, offset = self.joined_at, criteria.joined_before
+            rows = [row for row in rows if 0 < joined_at[row] < offset]
+        if criteria.exclude:
+            ids, exclude = self.ids, criteria.exclude
+            rows = [row for row in rows if ids[row] not in exclude]
+        if criteria.regex is not None:
+            names, match = self.names, criteria.regex.match
+            rows = [row for row in rows if match(names[row])]
+
+        ids = self.ids
+        return [ids[row] for row in rows]
+
+
+class RecentJoiners:
+    """
+    A snapshot of the latest maxlen members to join a guild. It is complete for every join after complete_since,
+    which is when tracking started, or the join time of the newest member evicted to keep it bounded.
+    """
+
+    def __init__(self, maxlen: int, complete_since: float):
+        self.maxlen = maxlen
+        self.complete_since = complete_since  # Unix timestamp
+        self.snapshot = MemberSnapshot()
+        self.order: "collections.deque[Tuple[int, float]]" = collections.deque()  # (member_id, joined_at), oldest first
+
+    def add(self, member: discord.Member) -> None:
+        self.snapshot.upsert(member)
+        self.order.append((member.id, self.snapshot.row(member.id).joined_at))
+
+        # Entries of members that left or rejoined are stale, but still count towards the bound
+        while len(self.order) > self.maxlen:
+            member_id, joined_at = self.order.popleft()
+            row = self.snapshot.row(member_id)
+            if row is not None and row.joined_at == joined_at:
+                self.snapshot.remove(member_id)
+                self.complete_since = max(self.complete_since, joined_at)
+
+    def covers(self, since: Optional[float]) -> bool:
+        """If every member that joined after since is in the snapshot."""
+        return since is not None and since >= self.complete_since
+
+
+class MemberIndex:
+    """
+    Member snapshots of guilds that have been filtered at least once. Snapshots are built from the member cache
+    of a chunked guild, and afterwards kept up to date from member events instead of being rebuilt.
+    Every guild also has a bounded index of its recent joiners, which can answer raid filters without
+    having to chunk the guild.
+    Large snapshots are built & filtered in a thread. While that runs, member events of the guild are deferred
+    and applied once it is done, so the thread never sees a snapshot change and no event is lost.
+    """
+
+    def __init__(self, offload_threshold: int = 25000, recent_limit: int = 5000):
+        self.offload_threshold = offload_threshold  # Snapshots larger than this are built & filtered in a thread
+        self.recent_limit = recent_limit  # Recent joiners kept per guild
+        self.guilds: Dict[int, MemberSnapshot] = {}
+        self.recent: Dict[int, RecentJoiners] = {}
+        self.started_at = time.time()  # Joins before this were not seen
+        self.builds: Dict[int, "asyncio.Task[MemberSnapshot]"] = {}  # guild_id -> snapshot being built in a thread
+        self.offloaded: Dict[int, int] = {}  # guild_id -> builds & filters running in a thread
+        self.deferred: Dict[int, List[Tuple[Callable, tuple]]] = {}  # guild_id -> (method, args) to apply afterwards
+
+    def _defer(self, guild_id: int, method: Callable, *args) -> bool:
+        """Defer a change to a guild's snapshots if they are in use by a thread. Returns if it was deferred."""
+
+        changes = self.deferred.get(guild_id)
+        if changes is None:
+            return False
+        changes.append((method, args))
+        return True
+
+    def _hold(self, guild_id: int) -> None:
+        """Start deferring changes to a guild's snapshots, as a thread is about to use them."""
+        self.offloaded[guild_id] = self.offloaded.get(guild_id, 0) + 1
+        self.deferred.setdefault(guild_id, [])
+
+    def _release(self, guild_id: int) -> None:
+        """Apply the deferred changes once no thread uses a guild's snapshots anymore."""
+
+        self.offloaded[guild_id] -= 1
+        if self.offloaded[guild_id]:
+            return
+        del self.offloaded[guild_id]
+        for method, args in self.deferred.pop(guild_id, ()):
+            method(*args)
+
+    async def _build(self, loop, guild_id: int, members: List[discord.Member]) -> MemberSnapshot:
+        """Build a snapshot in a thread, the guild must already be held."""
+
+        try:
+            snapshot = await loop.run_in_executor(None, MemberSnapshot.from_members, members)
+            if self.builds.get(guild_id) is asyncio.current_task():  # The guild may have been forgotten since
+                snapshot = self.guilds.setdefault(guild_id, snapshot)
+                del self.builds[guild_id]
+            return snapshot
+        finally:
+            self._release(guild_id)
+
+    async def get(self, loop, guild: discord.Guild) -> Optional[MemberSnapshot]:
+        """Get the snapshot of a guild, building it if the guild's members are cached. Returns None otherwise."""
+
+        snapshot = self.guilds.get(guild.id)
+        if snapshot is None and guild.chunked:
+            build = self.builds.get(guild.id)
+            if build is None:
+                members = guild.members
+                if len(members) < self.offload_threshold:
+                    snapshot = self.guilds[guild.id] = MemberSnapshot.from_members(members)
+                    logger.debug(f"Built member snapshot of {len(snapshot)} members for guild {guild.id}.")
+                    return snapshot
+                self._hold(guild.id)  # Right away, so changes arriving before the build starts are deferred too
+                build = self.builds[guild.id] = loop.create_task(self._build(loop, guild.id, members))
+            snapshot = await asyncio.shield(build)  # Shared by every caller while it is being built
+            logger.debug(f"Built member snapshot of {len(snapshot)} members for guild {guild.id}.")
+        return snapshot
+
+    async def filter(self, loop, guild_id: int, snapshot: MemberSnapshot, criteria: MemberFilter) -> List[int]:
+        """Filter one of a guild's snapshots, off the event loop if it is large."""
+
+        if len(snapshot) < self.offload_threshold:
+            return snapshot.filter(criteria)
+        self._hold(guild_id)
+        try:
+            return await loop.run_in_executor(None, snapshot.filter, criteria)
+        finally:
+            self._release(guild_id)
+
+    def get_recent(self, guild_id: int, since: Optional[float]) -> Optional[MemberSnapshot]:
+        """
+        Get the snapshot of a guild's recent joiners, if it contains every member that joined after since.
+        Returns None otherwise, in which case the guild's full member list is needed.
+        """
+
+        recent = self.recent.get(guild_id)
+        if recent is None:
+            recent = self.recent[guild_id] = RecentJoiners(self.recent_limit, self.started_at)
+        if recent.covers(since):
+            return recent.snapshot
+
+    def add_joiner(self, member: discord.Member) -> None:
+        if self._defer(member.guild.id, self.add_joiner, member):
+            return
+        recent = self.recent.get(member.guild.id)
+        if recent is None:
+            recent = self.recent[member.guild.id] = RecentJoiners(self.recent_limit, self.started_at)
+        recent.add(member)
+        self.update(member)
+
+    def update(self, member: discord.Member) -> None:
+        if self._defer(member.guild.id, self.update, member):
+            return
+        snapshot = self.guilds.get(member.guild.id)
+        if snapshot is not None:
+            snapshot.upsert(member)
+        recent = self.recent.get(member.guild.id)
+        if recent is not None and member.id in recent.snapshot:
+            recent.snapshot.upsert(member)
+
+    def remove(self, guild_id: int, member_id: int) -> None:
+        if self._defer(guild_id, self.remove, guild_id, member_id):
+            return
+        snapshot = self.guilds.get(guild_id)
+        if snapshot is not None:
+            snapshot.remove(member_id)
+        recent = self.recent.get(guild_id)
+        if recent is not None:
+            recent.snapshot.remove(member_id)
+
+    def update_user(self, user: discord.User) -> None:
+        """Refresh the rows of a user whose name or avatar changed, in every guild it is in."""
+
+        for guild in user.mutual_guilds:
+            member = guild.get_member(user.id)
+            if member:
+                self.update(member)
+
+    def forget_guild(self, guild_id: int) -> None:
+        self.guilds.pop(guild_id, None)
+        self.recent.pop(guild_id, None)
+        self.builds.pop(guild_id, None)  # A build still running is not stored
+        self.deferred.pop(guild_id, None)
@@ -0,0 +1,240 @@
+import collections
+import logging
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import asyncpg
+import discord
+
+from extensions.utils.db import bulk_upsert
+
+logger = logging.getLogger(__name__)
+
+# StoredMessage.flags bits
+HAS_ATTACHMENTS = 1 << 0
+HAS_EMBEDS = 1 << 1
+
+
+class StoredMessage(NamedTuple):
+    """The parts of a message needed to log its deletion or edit."""
+
+    id: int
+    channel_id: int
+    author_id: int
+    content: str
+    flags: int
+    created_at: int  # Unix timestamp
+
+    @classmethod
+    def from_message(cls, message: discord.Message) -> "StoredMessage":
+        flags = (HAS_ATTACHMENTS if message.attachments else 0) | (HAS_EMBEDS if message.embeds else 0)
+        return cls(
+            message.id,
+            message.channel.id,
+            message.author.id,
+            message.content,
+            flags,
+            int(message.created_at.timestamp()),
+        )
+
+    @property
+    def has_attachments(self) -> bool:
+        return bool(self.flags & HAS_ATTACHMENTS)
+
+    @property
+    def has_embeds(self) -> bool:
+        return bool(self.flags & HAS_EMBEDS)
+
+
+class MessageStore:
+    """
+    Keeps the content of recent messages per guild, without holding onto full discord.Message objects.
+    Each guild keeps its newest per_guild messages in memory, and no more than max_messages are kept overall,
+    taking the oldest messages of the least recently active guilds first. If spill is enabled, messages pushed
+    out of memory are written to the message_store table in batches, and looked up there on a miss.
+    Rows older than retention seconds are pruned.
+    """
+
+    def __init__(
+        self,
+        bot,
+        per_guild: int = 2000,
+        max_messages: int = 10000,
+        spill: bool = False,
+        retention: int = 86400 * 7,
+    ):
+        self.bot = bot
+        self.per_guild = per_guild
+        self.max_messages = max_messages
+        self.spill = spill
+        self.retention = retention
+        # guild_id -> messages oldest first, least recently active guild first
+        self.guilds: "collections.OrderedDict[int, collections.OrderedDict[int, StoredMessage]]" = (
+            collections.OrderedDict()
+        )
+        self.size = 0  # Messages in memory across all guilds
+        self.spill_buffer: List[tuple] = []  # (guild_id, *StoredMessage) rows waiting to be written
+
+    def add(self, message: discord.Message) -> None:
+        """Store a new message, pushing the oldest messages out if the guild or the store is full."""
+
+        guild_id = message.guild.id
+        messages = self.guilds.get(guild_id)
+        if messages is None:
+            messages = self.guilds[guild_id] = collections.OrderedDict()
+        else:
+            self.guilds.move_to_end(guild_id)
+
+        if message.id not in messages:
+            self.size += 1
+        messages[message.id] = StoredMessage.from_message(message)
+
+        if len(messages) > self.per_guild:
+            self._evict(guild_id, messages)
+        while self.size > self.max_messages:
+            self._evict(*next(iter(self.guilds.items())))
+
+    def _evict(self, guild_id: int, messages: "collections.OrderedDict[int, StoredMessage]") -> None:
+        """Push the oldest message of a guild out of memory, dropping the guild once it has none left."""
+
+        _, evicted = messages.popitem(last=False)
+        self.size -= 1
+        if not messages:
+            del self.guilds[guild_id]
+        if self.spill:
+            self.spill_buffer.append((guild_id, *evicted))
+
+    async def get(self, guild_id: int, message_id: int) -> Optional[StoredMessage]:
+        """Get a stored message from memory, or from the database if spilling is enabled."""
+
+        messages = self.guilds.get(guild_id)
+        if messages and message_id in messages:
+            return messages[message_id]
+
+        if not self.spill:
+            return None
+
+        for row in self.spill_buffer:  # Not written yet
+            if row[0] == guild_id and row[1] == message_id:
+                return StoredMessage(*row[1:])
+
+        record = await self.bot.pool.fetchrow(
+            """SELECT * FROM message_store WHERE guild_id = $1 AND message_id = $2""",
+            guild_id,
+            message_id,
+        )
+        if record:
+            return StoredMessage(
+                record.get("message_id"),
+                record.get("channel_id"),
+                record.get("author_id"),
+                record.get("content"),
+                record.get("flags"),
+                record.get("created_at"),
+            )
+
+    async def update(self, guild_id: int, message_id: int, content: str) -> Optional[StoredMessage]:
+        """Replace the content of a stored message after an edit. Returns the message as it was before the edit."""
+
+        before = await self.get(guild_id, message_id)
+        if before is None:
+            return None
+
+        messages = self.guilds.get(guild_id)
+        if messages and message_id in messages:
+            messages[message_id] = before._replace(content=content)
+            return before
+
+        # Only reached with spilling enabled, as get() does not look past memory otherwise
+        for index, row in enumerate(self.spill_buffer):  # Not written yet, the row would be written as it was
+            if row[0] == guild_id and row[1] == message_id:
+                self.spill_buffer[index] = (*row[:4], content, *row[5:])
+                break
+        else:
+            await self.bot.pool.execute(
+                """UPDATE message_store SET content = $1 WHERE guild_id = $2 AND message_id = $3""",
+                content,
+                guild_id,
+                message_id,
+            )
+        return before
+
+    async def pop(self, guild_id: int, message_id: int) -> Optional[StoredMessage]:
+        """Remove a deleted message from the store and return it."""
+
+        messages = self.guilds.get(guild_id)
+        if messages and message_id in messages:
+            stored = messages.pop(message_id)
+            self.size -= 1
+            if not messages:
+                del self.guilds[guild_id]
+            return stored
+
+        stored = await self.get(guild_id, message_id)
+        if stored and self.spill:
+            self.spill_buffer = [row for row in self.spill_buffer if row[1] != message_id]
+            await self.bot.pool.execute(
+                """DELETE FROM message_store WHERE guild_id = $1 AND message_id = $2""", guild_id, message_id
+            )
+        return stored
+
+    def discard(self, guild_id: int, message_ids: Iterable[int]) -> None:
+        """
+        Drop messages from memory & the write buffer without looking them up, used for bulk deletions.
+        Rows already written to the database are left to be pruned.
+        """
+
+        message_ids = set(message_ids)
+        messages = self.guilds.get(guild_id)
+        if messages:
+            for message_id in message_ids:
+                if messages.pop(message_id, None):
+                    self.size -= 1
+            if not messages:
+                del self.guilds[guild_id]
+        if self.spill_buffer:
+            self.spill_buffer = [row for row in self.spill_buffer if row[1] not in message_ids]
+
+    def forget_guild(self, guild_id: int) -> None:
+        """Drop all in-memory messages of a guild, the database rows are removed along with the guild's config."""
+        self.size -= len(self.guilds.pop(guild_id, ()))
+
+    async def flush(self) -> None:
+        """Write spilled messages to the database in one batch."""
+
+        if not self.spill_buffer:
+            return
+
+        rows, self.spill_buffer = self.spill_buffer, []
+        try:
+            await self._write(rows)
+        except asyncpg.exceptions.ForeignKeyViolationError:
+            logger.warning("Trying to spill messages of a guild that no longer exists, dropping them.")
+            await self._write([row for row in rows if self.bot.get_guild(row[0])])
+        except Exception:
+            self.spill_buffer = rows + self.spill_buffer  # Retry with the next flush
+            raise
+        logger.debug(f"Spilled {len(rows)} messages to the message store.")
+
+    async def _write(self, rows: List[tuple]) -> None:
+        await bulk_upsert(
+            self.bot.pool,
+            "message_store",
+            ["guild_id", "message_id", "channel_id", "author_id", "content", "flags", "created_at"],
+            rows,
+            conflict=["message_id"],
+            update=["content"],
+        )
+
+    async def prune(self) -> None:
+        """Delete spilled messages older than the retention period."""
+        await self.bot.pool.execute(
+            """DELETE FROM message_store WHERE created_at < $1""", int(time.time()) - self.retention
+        )
+
+    def stats(self) -> dict:
+        return {
+            "guilds": len(self.guilds),
+            "messages": self.size,
+            "spill_pending": len(self.spill_buffer),
+        }
@@ -0,0 +1,82 @@
+import logging
+from typing import Callable, Dict, Hashable, Iterable, List, Mapping, Tuple
+
+import asyncpg
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+class PersistentViewRegistry:
+    """
+    Keeps track of the persistent views registered for each message, so that rehydrating them on every READY
+    only registers views that are missing or whose rows changed, instead of rebuilding all of them.
+    Rows are streamed from the database with a cursor, grouped by message. signature returns the parts of a row
+    a view is built from. Commands attaching a view to a message, or deleting its rows, must register or forget it.
+    """
+
+    def __init__(self, bot, signature: Callable[[Mapping], Hashable], prefetch: int = 500):
+        self.bot = bot
+        self.signature = signature
+        self.prefetch = prefetch
+        self.views: Dict[int, Tuple[Hashable, discord.ui.View]] = {}  # message_id -> (signature, view)
+
+    def _set(self, message_id: int, rows_signature: Hashable, view: discord.ui.View) -> None:
+        entry = self.views.get(message_id)
+        if entry and entry[1] is not view:
+            entry[1].stop()  # Finished views are dropped from the bot's view store
+        self.views[message_id] = (rows_signature, view)
+
+    def register(self, message_id: int, records: Iterable[Mapping], view: discord.ui.View) -> None:
+        """Record a view that was attached to a message, e.g. by editing the message, built from records."""
+        self._set(message_id, tuple(self.signature(record) for record in records), view)
+
+    def forget(self, message_id: int) -> None:
+        """Drop the view of a message whose rows were deleted, so it no longer handles interactions."""
+        entry = self.views.pop(message_id, None)
+        if entry:
+            entry[1].stop()
+
+    async def rehydrate(
+        self,
+        query: str,
+        build_view: Callable[[List[asyncpg.Record]], discord.ui.View],
+        *args,
+    ) -> Tuple[int, int]:
+        """
+        Stream the rows returned by query, which must have a msg_id column & be ordered by it,
+        and register a view built from each message's rows unless an identical one is already registered.
+        Returns the amount of views registered & the amount of messages seen.
+        """
+
+        alive = {id(view) for view in self.bot.persistent_views}  # READY may have cleared the view store
+        seen = set()
+        registered = 0
+
+        def sync(message_id: int, records: List[asyncpg.Record]) -> bool:
+            seen.add(message_id)
+            rows_signature = tuple(self.signature(record) for record in records)
+            entry = self.views.get(message_id)
+            if entry and entry[0] == rows_signature and id(entry[1]) in alive:
+                return False
+            view = build_view(records)
+            self.bot.add_view(view, message_id=message_id)
+            self._set(message_id, rows_signature, view)
+            return True
+
+        async with self.bot.pool.acquire() as con:
+            async with con.transaction():  # Cursors only live inside a transaction
+                message_id, records = None, []
+                async for record in con.cursor(query, *args, prefetch=self.prefetch):
+                    if record.get("msg_id") != message_id and records:
+                        registered += sync(message_id, records)
+                        records = []
+                    message_id = record.get("msg_id")
+                    records.append(record)
+                if records:
+                    registered += sync(message_id, records)
+
+        for message_id in set(self.views) - seen:  # Rows deleted since the last rehydration
+            self.forget(message_id)
+
+        return registered, len(seen)
@@ -0,0 +1,189 @@
+import asyncio
+import datetime
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional, Set
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+LINK_REGEX = re.compile(r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+")
+INVITE_REGEX = re.compile(r"(?:https?://)?discord(?:app)?\.(?:com/invite|gg)/[a-zA-Z0-9]+/?")
+
+# Discord refuses to bulk delete messages older than 14 days, keep a margin for messages aging during the purge
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=5)
+BULK_DELETE_SIZE = 100
+
+
+@dataclass
+class PurgeFilter:
+    """Criteria a message must all satisfy to be purged. An empty filter matches every message."""
+
+    author_ids: Set[int] = field(default_factory=set)
+    regex: Optional["re.Pattern"] = None
+    contains: Optional[str] = None
+    startswith: Optional[str] = None
+    endswith: Optional[str] = None
+    links: bool = False
+    invites: bool = False
+    attachments: bool = False
+    notext: bool = False
+
+    def compile(self) -> Callable[[discord.Message], bool]:
+        """Turn the criteria into a single check, so they are not re-evaluated for every message."""
+
+        checks: List[Callable[[discord.Message], bool]] = []
+
+        # Cheap checks first, regexes last
+        if self.author_ids:
+            author_ids = frozenset(self.author_ids)
+            checks.append(lambda message: message.author.id in author_ids)
+        if self.attachments:
+            checks.append(lambda message: bool(message.attachments))
+        if self.notext:
+            checks.append(lambda message: not message.content)
+        if self.startswith is not None:
+            checks.append(lambda message, text=self.startswith: message.content.startswith(text))
+        if self.endswith is not None:
+            checks.append(lambda message, text=self.endswith: message.content.endswith(text))
+        if self.contains is not None:
+            checks.append(lambda message, text=self.contains: text in message.content)
+        if self.invites:
+            checks.append(lambda message: INVITE_REGEX.search(message.content) is not None)
+        if self.links:
+            checks.append(lambda message: LINK_REGEX.search(message.content) is not None)
+        if self.regex is not None:
+            checks.append(lambda message, search=self.regex.search: search(message.content) is not None)
+
+        if not checks:
+            return lambda message: True
+        if len(checks) == 1:
+            return checks[0]
+        return lambda message: all(check(message) for check in checks)
+
+
+@dataclass
+class PurgeResult:
+    scanned: int = 0
+    deleted: int = 0
+    failed: int = 0
+    finished: bool = False
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+
+class PurgeEngine:
+    """
+    Deletes messages matching a check from the latest limit messages of a channel.
+    History is paged through 100 messages at a time, matching messages newer than 14 days are bulk deleted
+    in batches of 100, while older ones, which can only be deleted one by one, are handed to a few workers.
+    Progress is reported through an optional callback at most once per progress_interval seconds.
+    """
+
+    def __init__(
+        self,
+        channel: discord.TextChannel,
+        check: Callable[[discord.Message], bool],
+        limit: int,
+        *,
+        before: discord.abc.Snowflake = None,
+        concurrency: int = 3,
+        progress: Callable[[PurgeResult], Awaitable] = None,
+        progress_interval: float = 3.0,
+    ):
+        self.channel = channel
+        self.check = check
+        self.limit = limit
+        self.before = before
+        self.concurrency = concurrency
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.result = PurgeResult()
+
+    async def _bulk_delete(self, messages: List[discord.Message]) -> None:
+        try:
+            if len(messages) == 1:
+                await messages[0].delete()
+            else:
+                await self.channel.delete_messages(messages)
+        except discord.NotFound:  # One of them was already deleted, fall back to deleting them one by one
+            for message in messages:
+                await self._delete(message)
+        except discord.HTTPException as error:
+            logger.warning(f"Failed bulk deleting {len(messages)} messages in channel {self.channel.id}: {error}")
+            self.result.failed += len(messages)
+        else:
+            self.result.deleted += len(messages)
+
+    async def _delete(self, message: discord.Message) -> None:
+        try:
+            await message.delete()
+        except discord.NotFound:
+            pass
+        except discord.HTTPException:
+            self.result.failed += 1
+        else:
+            self.result.deleted += 1
+
+    async def _worker(self, queue: "asyncio.Queue[Optional[discord.Message]]") -> None:
+        while True:
+            message = await queue.get()
+            if message is None:
+                return
+            await self._delete(message)
+
+    async def _report_progress(self) -> None:
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            try:
+                await self.progress(self.result)
+            except discord.HTTPException as error:
+                logger.debug(f"Failed reporting purge progress: {error}")
+
+    async def run(self) -> PurgeResult:
+        """Scan the channel's history and delete every matching message. Returns the amount of messages purged."""
+
+        queue: "asyncio.Queue[Optional[discord.Message]]" = asyncio.Queue(maxsize=self.concurrency * 10)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        reporter = asyncio.create_task(self._report_progress()) if self.progress else None
+
+        bulk_cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        batch: List[discord.Message] = []
+        try:
+            async for message in self.channel.history(limit=self.limit, before=self.before):
+                self.result.scanned += 1
+                if not self.check(message):
+                    continue
+
+                if message.created_at > bulk_cutoff:
+                    batch.append(message)
+                    if len(batch) >= BULK_DELETE_SIZE:
+                        await self._bulk_delete(batch)
+                        batch = []
+                else:
+                    await queue.put(message)  # Blocks while the workers are behind, so history is not read ahead
+
+            if batch:
+                await self._bulk_delete(batch)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            if reporter:
+                reporter.cancel()
+
+        self.result.finished = True
+        if self.progress:
+            try:
+                await self.progress(self.result)
+            except discord.HTTPException as error:
+                logger.debug(f"Failed reporting purge progress: {error}")
+        return self.result
@@ -0,0 +1,132 @@
+import datetime
+import functools
+import logging
+import re
+import string
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DATE_AND_TIME_REGEX = re.compile(r"\d{4}-[0-1]\d-[0-3]\d [0-2]\d:[0-5]\d")
+DATE_REGEX = re.compile(r"\d{4}-[0-1]\d-[0-3]\d")
+# Get any pair of <number><word> with a single optional space in between
+TIME_REGEX = re.compile(r"(\d+(?:[.,]\d+)?)\s{0,1}([a-zA-Z]+)")
+
+TIME_LETTER_DICT = {
+    "h": 3600,
+    "s": 1,
+    "m": 60,
+    "d": 86400,
+    "w": 86400 * 7,
+    "M": 86400 * 30,
+    "Y": 86400 * 365,
+    "y": 86400 * 365,
+}
+TIME_WORD_DICT = {
+    "hour": 3600,
+    "second": 1,
+    "minute": 60,
+    "day": 86400,
+    "week": 86400 * 7,
+    "month": 86400 * 30,
+    "year": 86400 * 365,
+    "sec": 1,
+    "min": 60,
+}
+
+
+def _edits(word: str) -> set:
+    """Return every string that is exactly one insertion, deletion or substitution away from word."""
+    letters = string.ascii_lowercase
+    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    deletes = {left + right[1:] for left, right in splits if right}
+    replaces = {left + char + right[1:] for left, right in splits if right for char in letters}
+    inserts = {left + char + right for left, right in splits for char in letters}
+    return deletes | replaces | inserts
+
+
+def _build_fuzzy_lookup() -> dict:
+    """
+    Precompute a lookup of every lowercase word within a Levenshtein distance of 1
+    of a time unit name, mapped to that unit's length in seconds.
+    Earlier keys in TIME_WORD_DICT take precedence, same as a linear scan would.
+    """
+    lookup = {}
+    for word, seconds in TIME_WORD_DICT.items():
+        for variant in _edits(word) | {word}:
+            lookup.setdefault(variant, seconds)
+    return lookup
+
+
+FUZZY_WORD_LOOKUP = _build_fuzzy_lookup()
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_absolute(timestr: str) -> Tuple[Optional[datetime.datetime], Optional[str]]:
+    """
+    Look for an absolute date, optionally with a time, in the string.
+    Returns the datetime and the string it was extracted from, or (None, None) if there is no match.
+    """
+    date_and_time_match = DATE_AND_TIME_REGEX.search(timestr)
+    if date_and_time_match:
+        time = datetime.datetime.strptime(date_and_time_match.group(), "%Y-%m-%d %H:%M")
+        return time.replace(tzinfo=datetime.timezone.utc), date_and_time_match.group()
+
+    date_match = DATE_REGEX.search(timestr)
+    if date_match:
+        time = datetime.datetime.strptime(date_match.group(), "%Y-%m-%d")
+        return time.replace(tzinfo=datetime.timezone.utc), date_match.group()
+
+    return None, None
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_relative(timestr: str) -> Tuple[float, Tuple[str, ...]]:
+    """
+    Sum up all <number><unit> pairs in the string.
+    Returns the total amount of seconds and all strings the time was extracted from.
+    """
+    seconds = 0
+    strings = []  # Stores all identified times
+
+    for val, category in TIME_REGEX.findall(timestr):
+        val = val.replace(",", ".")  # Replace commas with periods to correctly register decimal places
+
+        if len(category) == 1:
+            unit = TIME_LETTER_DICT.get(category)
+        else:
+            # Words are case-insensitive, as opposed to single letters
+            unit = FUZZY_WORD_LOOKUP.get(category.lower())
+
+        if unit:
+            seconds += unit * float(val)
+            strings.append(val + category)
+            strings.append(val + " " + category)  # Append both with space & without
+
+    return seconds, tuple(strings)
+
+
+def parse_time(timestr: str, force_mode: str = None) -> Tuple[datetime.datetime, List[str]]:
+    """
+    Convert a string to datetime.datetime, returns datetime.datetime and strings it extracted from if successful,
+    otherwise raises ValueError. force_mode may be 'absolute' or 'relative' to only try that conversion.
+    """
+
+    logger.debug(f"String passed for time conversion: {timestr}")
+
+    if not force_mode or force_mode == "absolute":
+        time, match = parse_absolute(timestr)
+        if time:
+            if time > datetime.datetime.now(datetime.timezone.utc):
+                return time, [match]
+            else:
+                raise ValueError("Date is not in the future.")
+
+    if not force_mode or force_mode == "relative":
+        seconds, strings = parse_relative(timestr)
+
+        # If time is 0, then we failed to parse or the user indeed provided 0, which makes no sense
+        if seconds <= 0:
+            raise ValueError("Failed converting time from string. (Relative conversion)")
+
+        return datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=seconds), list(strings)